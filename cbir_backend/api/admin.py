@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Image, SearchHistory
+from .models import DailyStat, Image, IngestJob, SearchHistory
 
 
 @admin.register(Image)
@@ -15,3 +15,15 @@ class SearchHistoryAdmin(admin.ModelAdmin):
     list_filter = ('searched_at',)
     search_fields = ('user__username',)
 
+
+
+@admin.register(IngestJob)
+class IngestJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'image', 'status', 'priority', 'attempts', 'updated_at')
+    list_filter = ('status', 'priority')
+
+
+@admin.register(DailyStat)
+class DailyStatAdmin(admin.ModelAdmin):
+    list_display = ('date', 'uploads', 'searches', 'signups')
+    date_hierarchy = 'date'
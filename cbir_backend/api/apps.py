@@ -1,7 +1,25 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
 
+    def ready(self):
+        from .search_engine import connect_signals as connect_vector_signals
+        from .stats import connect_signals
+
+        connect_signals()
+        connect_vector_signals()
+
+        # Pillow refuses to decode anything larger (DecompressionBombError)
+        from PIL import Image
+
+        Image.MAX_IMAGE_PIXELS = getattr(settings, "IMAGE_MAX_PIXELS", Image.MAX_IMAGE_PIXELS)
+
+        # Load CLIP weights at startup so forked gunicorn workers share them
+        if getattr(settings, "CLIP_PRELOAD", False):
+            from .warmup import preload_model
+
+            preload_model()
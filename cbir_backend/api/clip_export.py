@@ -0,0 +1,104 @@
+"""Export and validation of the alternative CLIP image-encoder backends.
+
+``export_onnx`` writes the CLIP visual tower to an ONNX graph for the
+``onnx`` backend. ``check_agreement`` encodes the same images with eager
+torch and with another backend and reports the per-image cosine
+similarity, so a backend is only deployed if the vectors it produces stay
+interchangeable with those already stored in the index.
+"""
+
+import logging
+import os
+import random
+from typing import Dict, List, Optional
+
+import numpy as np
+from PIL import Image as PILImage
+
+from .clip_utils import (
+    CLIP_INPUT_SIZE, create_onnx_session, encode_image_batch, load_clip_model, preprocess_images, run_onnx_session,
+)
+
+logger = logging.getLogger(__name__)
+
+ONNX_INPUT_NAME = "pixel_values"
+ONNX_OUTPUT_NAME = "image_embeds"
+
+
+def export_onnx(path: str, opset: int = 17) -> str:
+    """Export the CLIP image encoder to ``path`` with a dynamic batch axis."""
+    import copy
+
+    import torch
+
+    model, _ = load_clip_model()
+    visual = copy.deepcopy(model.visual).float().cpu().eval()
+    dummy = torch.randn(1, 3, CLIP_INPUT_SIZE, CLIP_INPUT_SIZE)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with torch.no_grad():
+        torch.onnx.export(
+            visual,
+            dummy,
+            path,
+            input_names=[ONNX_INPUT_NAME],
+            output_names=[ONNX_OUTPUT_NAME],
+            dynamic_axes={ONNX_INPUT_NAME: {0: "batch"}, ONNX_OUTPUT_NAME: {0: "batch"}},
+            opset_version=opset,
+            do_constant_folding=True,
+        )
+    logger.info("Exported CLIP image encoder to %s (opset %d)", path, opset)
+    return path
+
+
+def quantize_onnx(path: str, output_path: str) -> str:
+    """Write an INT8 dynamically quantized copy of an exported ONNX encoder."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(path, output_path, weight_type=QuantType.QInt8)
+    logger.info("Wrote INT8 ONNX encoder to %s", output_path)
+    return output_path
+
+
+def sample_images(count: int) -> List:
+    """Pick up to ``count`` stored images, padded with synthetic ones if the database is short."""
+    from .models import DatasetImage, Image
+
+    paths = []
+    for model in (DatasetImage, Image):
+        for record in model.objects.only("image")[:count]:
+            if record.image and os.path.exists(record.image.path):
+                paths.append(record.image.path)
+    random.shuffle(paths)
+    samples = paths[:count]
+
+    rng = np.random.default_rng(0)
+    while len(samples) < count:
+        pixels = rng.integers(0, 256, size=(256, 256, 3), dtype=np.uint8)
+        samples.append(PILImage.fromarray(pixels, "RGB"))
+    return samples
+
+
+def check_agreement(
+    backend: str, images: List, onnx_path: Optional[str] = None, batch_size: int = 16
+) -> Dict[str, float]:
+    """Compare ``backend`` embeddings with eager torch on ``images``.
+
+    ``onnx_path`` checks an exported file other than ``CLIP_ONNX_PATH``.
+    Returns the minimum and mean cosine similarity.
+    """
+    session = create_onnx_session(onnx_path) if backend == "onnx" and onnx_path else None
+
+    similarities = []
+    for start in range(0, len(images), batch_size):
+        batch = preprocess_images(images[start:start + batch_size])
+        reference = encode_image_batch(batch, backend="torch")
+        if session is not None:
+            candidate = run_onnx_session(session, batch)
+        else:
+            candidate = encode_image_batch(batch, backend=backend)
+        candidate = candidate.astype(np.float32)
+        candidate /= np.linalg.norm(candidate, axis=-1, keepdims=True)
+        similarities.extend(np.sum(reference * candidate, axis=1).tolist())
+
+    return {"min_cosine": float(np.min(similarities)), "mean_cosine": float(np.mean(similarities))}
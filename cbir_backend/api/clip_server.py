@@ -0,0 +1,218 @@
+"""Shared CLIP inference server reached over a Unix socket.
+
+One ``clip_server`` process loads the model once and serves every gunicorn
+worker, for image and text queries alike. Concurrent image requests are
+grouped into batches bounded by ``max_batch`` images and ``max_wait_ms``
+of queueing delay; text requests are encoded as they arrive.
+
+Wire format (network byte order)::
+
+    request:  kind:B (0 images, 1 UTF-8 texts), count:I,
+              then count x (length:I, payload bytes)
+    response: status:B, then
+              status 0 -> rows:I, dim:I, rows x dim float32
+              status 1 -> length:I, UTF-8 error message
+"""
+
+import io
+import logging
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Optional
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+_COUNT = struct.Struct("!I")
+_SHAPE = struct.Struct("!II")
+_STATUS = struct.Struct("!B")
+_KIND = struct.Struct("!B")
+STATUS_OK = 0
+STATUS_ERROR = 1
+KIND_IMAGES = 0
+KIND_TEXTS = 1
+
+
+class ClipServerError(RuntimeError):
+    """The inference server answered with an error."""
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray()
+    while len(buffer) < size:
+        chunk = sock.recv(size - len(buffer))
+        if not chunk:
+            raise ConnectionError("Connection closed mid-message")
+        buffer.extend(chunk)
+    return bytes(buffer)
+
+
+def image_bytes(image_file) -> bytes:
+    """Return the encoded bytes of an upload, file path, file object or PIL image."""
+    if isinstance(image_file, bytes):
+        return image_file
+    if isinstance(image_file, Image.Image):
+        buffer = io.BytesIO()
+        image_file.save(buffer, format="PNG")
+        return buffer.getvalue()
+    if isinstance(image_file, (str, os.PathLike)):
+        with open(image_file, "rb") as handle:
+            return handle.read()
+    image_file.seek(0)
+    data = image_file.read()
+    image_file.seek(0)
+    return data
+
+
+# ---------------------------------------------------------------------
+# Client
+# ---------------------------------------------------------------------
+
+def _request(kind: int, payloads: List[bytes], socket_path: str, timeout: float) -> np.ndarray:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(_KIND.pack(kind) + _COUNT.pack(len(payloads)))
+        for payload in payloads:
+            sock.sendall(_COUNT.pack(len(payload)))
+            sock.sendall(payload)
+
+        (status,) = _STATUS.unpack(_recv_exact(sock, _STATUS.size))
+        if status != STATUS_OK:
+            (length,) = _COUNT.unpack(_recv_exact(sock, _COUNT.size))
+            raise ClipServerError(_recv_exact(sock, length).decode("utf-8", errors="replace"))
+
+        rows, dimension = _SHAPE.unpack(_recv_exact(sock, _SHAPE.size))
+        data = _recv_exact(sock, rows * dimension * 4)
+    return np.frombuffer(data, dtype=">f4").astype(np.float32).reshape(rows, dimension)
+
+
+def embed_remote(image_files, socket_path: str, timeout: float = 30.0) -> np.ndarray:
+    """Embed images through the inference server; raises ``OSError`` if unreachable."""
+    return _request(KIND_IMAGES, [image_bytes(image_file) for image_file in image_files], socket_path, timeout)
+
+
+def embed_text_remote(texts: List[str], socket_path: str, timeout: float = 30.0) -> np.ndarray:
+    """Embed text queries through the inference server; raises ``OSError`` if unreachable."""
+    return _request(KIND_TEXTS, [text.encode("utf-8") for text in texts], socket_path, timeout)
+
+
+# ---------------------------------------------------------------------
+# Server
+# ---------------------------------------------------------------------
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        server: "ClipServer" = self.server.clip_server
+        try:
+            (kind,) = _KIND.unpack(_recv_exact(self.request, _KIND.size))
+            (count,) = _COUNT.unpack(_recv_exact(self.request, _COUNT.size))
+            payloads = []
+            for _ in range(count):
+                (length,) = _COUNT.unpack(_recv_exact(self.request, _COUNT.size))
+                payloads.append(_recv_exact(self.request, length))
+        except ConnectionError:
+            return
+
+        try:
+            if kind == KIND_TEXTS:
+                features = server.encode_texts([payload.decode("utf-8") for payload in payloads])
+            else:
+                futures = [server.submit(payload) for payload in payloads]
+                features = np.stack([future.result() for future in futures])
+            features = features.astype(">f4")
+        except Exception as exc:  # pylint: disable=broad-except
+            message = str(exc).encode("utf-8")
+            self.request.sendall(_STATUS.pack(STATUS_ERROR) + _COUNT.pack(len(message)) + message)
+            return
+
+        self.request.sendall(_STATUS.pack(STATUS_OK) + _SHAPE.pack(*features.shape) + features.tobytes())
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class ClipServer:
+    """Loads the CLIP encoders once and encodes queued images in dynamic batches."""
+
+    def __init__(self, socket_path: str, max_batch: int = 32, max_wait_ms: float = 10.0):
+        self.socket_path = socket_path
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._server: Optional[_UnixServer] = None
+
+    def submit(self, payload: bytes) -> Future:
+        """Decode and preprocess ``payload`` in the caller's thread, then queue it."""
+        from .clip_utils import preprocess_images
+
+        pixels = preprocess_images([io.BytesIO(payload)])[0]
+        future: Future = Future()
+        self._queue.put((pixels, future))
+        return future
+
+    def encode_texts(self, texts: List[str]) -> np.ndarray:
+        from .clip_utils import encode_text_batch
+
+        return encode_text_batch(texts)
+
+    def _next_batch(self) -> List:
+        items = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(items) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                items.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return items
+
+    def _batch_loop(self) -> None:
+        from .clip_utils import encode_image_batch
+
+        while True:
+            items = self._next_batch()
+            try:
+                features = encode_image_batch(np.stack([pixels for pixels, _ in items]))
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.exception("Batch of %d images failed", len(items))
+                for _, future in items:
+                    future.set_exception(exc)
+                continue
+            for (_, future), row in zip(items, features):
+                future.set_result(row)
+            logger.debug("Encoded batch of %d images", len(items))
+
+    def serve_forever(self) -> None:
+        """Load the model, bind the socket and serve until interrupted."""
+        from .clip_utils import get_backend, load_backend, load_text_encoder
+
+        load_backend()
+        load_text_encoder()
+        logger.info("CLIP server using the %s backend", get_backend())
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+        self._server = _UnixServer(self.socket_path, _RequestHandler)
+        self._server.clip_server = self
+        os.chmod(self.socket_path, 0o660)
+        threading.Thread(target=self._batch_loop, name="clip-batcher", daemon=True).start()
+        logger.info("CLIP server listening on %s (max_batch=%d, max_wait=%.1fms)",
+                    self.socket_path, self.max_batch, self.max_wait * 1000)
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
@@ -1,23 +1,60 @@
 import io
 import json
 import logging
-from typing import Tuple
+import os
+import struct
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional, Tuple
 
-import clip
 import numpy as np
-import torch
-from PIL import Image
-from django.core.files.uploadedfile import InMemoryUploadedFile
+from PIL import Image, ImageOps
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from . import metrics
+
+if TYPE_CHECKING:  # torch, clip and onnxruntime are imported lazily; see load_clip_model
+    import clip
+    import onnxruntime
+    import torch
 
 logger = logging.getLogger(__name__)
 
+CLIP_MODEL_NAME = "ViT-B/32"
+CLIP_INPUT_SIZE = 224
+
+# Names the decode/resize pipeline in embedding cache keys; bump it whenever
+# preprocessing changes the pixels the encoder sees
+PREPROCESS_VERSION = "draft1"
+
+# CLIP's Normalize(mean, std) folded into one multiply-add on 0-255 pixels
+_CLIP_MEAN = np.array([0.48145466, 0.4578275, 0.40821073], dtype=np.float32)
+_CLIP_STD = np.array([0.26862954, 0.26130258, 0.27577711], dtype=np.float32)
+_PIXEL_SCALE = 1.0 / (255.0 * _CLIP_STD)
+_PIXEL_OFFSET = -_CLIP_MEAN / _CLIP_STD
+
+CLIP_BACKENDS = ("torch", "onnx", "int8")
+
 _clip_model = None
 _clip_preprocess = None
 _device = None
+_backend = None
+_onnx_session = None
+_int8_visual = None
+_text_cache = None
+
+# Binary vector layout: magic, format version, dtype code, dimension, then raw data
+_VECTOR_HEADER = struct.Struct("<2sBBI")
+_VECTOR_MAGIC = b"FV"
+_VECTOR_VERSION = 1
+_VECTOR_DTYPES = {0: np.dtype("<f4"), 1: np.dtype("<f2")}
+_VECTOR_DTYPE_CODES = {dtype: code for code, dtype in _VECTOR_DTYPES.items()}
 
 
 def _detect_device() -> str:
     """Detect the execution device and log it."""
+    import torch
+
     device = "cuda" if torch.cuda.is_available() else "cpu"
     gpu_name = torch.cuda.get_device_name(0) if torch.cuda.is_available() else "CPU only"
     print(f"🚀 Using device: {device.upper()} ({gpu_name})")
@@ -38,12 +75,18 @@ def get_device() -> str:
 
 
 
-def load_clip_model() -> Tuple[torch.nn.Module, clip.model.CLIP]:
-    """Load the CLIP ViT-B/32 model on the detected device."""
+def load_clip_model() -> Tuple["torch.nn.Module", "clip.model.CLIP"]:
+    """Load the CLIP ViT-B/32 model on the detected device.
+
+    ``torch`` and ``clip`` are first imported here, so processes that never
+    run inference (migrations, auth-only workers) never load the ML stack.
+    """
     global _clip_model, _clip_preprocess
     if _clip_model is None or _clip_preprocess is None:
+        import clip
+
         device = get_device()
-        _clip_model, _clip_preprocess = clip.load("ViT-B/32", device=device)
+        _clip_model, _clip_preprocess = clip.load(CLIP_MODEL_NAME, device=device)
         _clip_model.eval()
         if device == "cuda":
             logger.info("Loaded CLIP ViT-B/32 model on GPU")
@@ -52,34 +95,302 @@ def load_clip_model() -> Tuple[torch.nn.Module, clip.model.CLIP]:
     return _clip_model, _clip_preprocess
 
 
-def _prepare_image(image_file) -> Image.Image:
-    """Normalize different file inputs to a PIL image."""
-    if isinstance(image_file, InMemoryUploadedFile):
-        data = image_file.read()
-        image = Image.open(io.BytesIO(data))
+def _open_image(image_file) -> Image.Image:
+    """Open an upload, file object, path or PIL image without decoding its pixels.
+
+    Images above ``IMAGE_MAX_PIXELS`` are rejected from the header alone,
+    before any memory is spent on them.
+    """
+    if isinstance(image_file, Image.Image):
+        return image_file
+    if hasattr(image_file, "seek"):
         image_file.seek(0)
-    elif isinstance(image_file, Image.Image):
-        image = image_file
-    else:
-        image = Image.open(image_file)
-    if image.mode == "RGBA":
-        image = image.convert("RGB")
+    image = Image.open(image_file)
+    limit = getattr(settings, "IMAGE_MAX_PIXELS", None)
+    if limit and image.width * image.height > limit:
+        raise Image.DecompressionBombError(
+            f"Image size ({image.width * image.height} pixels) exceeds limit of {limit} pixels"
+        )
     return image
 
 
+def _prepare_image(image_file, size: int = CLIP_INPUT_SIZE) -> Image.Image:
+    """Decode an image upright in RGB, resized and center-cropped to ``size`` x ``size``.
+
+    Matches CLIP's Resize + CenterCrop, but JPEGs are decoded in draft mode
+    at the smallest DCT scale still covering ``size``, and other formats are
+    shrunk with ``reduce`` before the final bicubic pass, so large photos are
+    never materialized at full resolution.
+    """
+    with metrics.span("decode"):
+        image = _open_image(image_file)
+        image.draft("RGB", (size, size))
+        image = ImageOps.exif_transpose(image)
+        if hasattr(image_file, "seek"):
+            image_file.seek(0)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        image.load()
+
+    with metrics.span("preprocess"):
+        width, height = image.size
+        if width <= height:
+            resized = (size, int(size * height / width))
+        else:
+            resized = (int(size * width / height), size)
+        if resized != image.size:
+            image = image.resize(resized, Image.Resampling.BICUBIC, reducing_gap=3.0)
+
+        left = int(round((image.width - size) / 2.0))
+        top = int(round((image.height - size) / 2.0))
+        return image.crop((left, top, left + size, top + size))
+
+
+def normalize_pixels(pixels: np.ndarray) -> np.ndarray:
+    """Turn a uint8 ``(N, H, W, 3)`` batch into CLIP's float32 ``(N, 3, H, W)`` input."""
+    batch = pixels.astype(np.float32)
+    batch *= _PIXEL_SCALE
+    batch += _PIXEL_OFFSET
+    return np.ascontiguousarray(batch.transpose(0, 3, 1, 2))
+
+
+def preprocess_images(image_files, size: int = CLIP_INPUT_SIZE) -> np.ndarray:
+    """Decode and normalize images into a float32 ``(N, 3, size, size)`` CLIP input batch."""
+    pixels = np.stack([np.asarray(_prepare_image(image_file, size)) for image_file in image_files])
+    with metrics.span("normalize"):
+        return normalize_pixels(pixels)
+
+
+def get_backend() -> str:
+    """Return the image-encoder backend selected by ``CLIP_BACKEND``.
+
+    ``onnx`` always runs on the CPU; ``int8`` is replaced by the eager torch
+    model on a GPU host.
+    """
+    global _backend
+    if _backend is None:
+        backend = getattr(settings, "CLIP_BACKEND", "torch")
+        if backend not in CLIP_BACKENDS:
+            raise ImproperlyConfigured(
+                f"CLIP_BACKEND must be one of {', '.join(CLIP_BACKENDS)}, got {backend!r}"
+            )
+        if backend == "int8" and get_device() != "cpu":
+            logger.warning("CLIP_BACKEND=%s is CPU-only, using torch on %s", backend, get_device())
+            backend = "torch"
+        _backend = backend
+    return _backend
+
+
+def embedding_model_id() -> str:
+    """Identify what produced an embedding: CLIP weights, encoder backend and preprocessing.
+
+    ONNX and INT8 vectors differ slightly from torch ones, so each
+    combination gets its own embedding cache entries.
+    """
+    return f"{CLIP_MODEL_NAME}:{get_backend()}:{PREPROCESS_VERSION}"
+
+
+def create_onnx_session(path: str) -> "onnxruntime.InferenceSession":
+    """Open an exported CLIP image encoder with ONNX Runtime on the CPU."""
+    try:
+        import onnxruntime
+    except ImportError as exc:
+        raise ImproperlyConfigured("The onnx CLIP backend requires the onnxruntime package") from exc
+    if not os.path.exists(path):
+        raise ImproperlyConfigured(f"ONNX model {path} not found; run `python manage.py export_clip_onnx`")
+
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    threads = getattr(settings, "CLIP_ONNX_THREADS", 0)
+    if threads:
+        options.intra_op_num_threads = threads
+    return onnxruntime.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+
+
+def _get_onnx_session() -> "onnxruntime.InferenceSession":
+    global _onnx_session
+    if _onnx_session is None:
+        _onnx_session = create_onnx_session(settings.CLIP_ONNX_PATH)
+        logger.info("Loaded CLIP image encoder from %s with ONNX Runtime", settings.CLIP_ONNX_PATH)
+    return _onnx_session
+
+
+def quantize_visual() -> "torch.nn.Module":
+    """Return an INT8 dynamically quantized copy of the CLIP image encoder.
+
+    Linear layer weights are stored as int8 and activations are quantized
+    on the fly, so no calibration data is needed.
+    """
+    import copy
+
+    import torch
+
+    model, _ = load_clip_model()
+    visual = copy.deepcopy(model.visual).float().cpu().eval()
+    return torch.ao.quantization.quantize_dynamic(visual, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _get_int8_visual() -> "torch.nn.Module":
+    global _int8_visual
+    if _int8_visual is None:
+        _int8_visual = quantize_visual()
+        logger.info("Quantized CLIP image encoder to INT8")
+    return _int8_visual
+
+
+def load_backend() -> None:
+    """Load everything the configured backend needs to encode images."""
+    backend = get_backend()
+    if backend == "onnx":
+        _get_onnx_session()
+    elif backend == "int8":
+        _get_int8_visual()
+    else:
+        load_clip_model()
+
+
+def run_onnx_session(session: "onnxruntime.InferenceSession", batch: np.ndarray) -> np.ndarray:
+    """Run an exported image encoder on a preprocessed batch."""
+    return session.run(None, {session.get_inputs()[0].name: batch})[0]
+
+
+def encode_image_batch(batch: np.ndarray, backend: Optional[str] = None) -> np.ndarray:
+    """Encode a preprocessed image batch into L2-normalized float32 features."""
+    backend = backend or get_backend()
+    with metrics.span("encode"):
+        if backend == "onnx":
+            features = run_onnx_session(_get_onnx_session(), batch)
+        else:
+            import torch
+
+            with torch.no_grad():
+                tensor = torch.from_numpy(batch)
+                if backend == "int8":
+                    features = _get_int8_visual()(tensor).numpy()
+                else:
+                    model, _ = load_clip_model()
+                    features = model.encode_image(tensor.to(get_device())).float().cpu().numpy()
+
+        features = features.astype(np.float32)
+        features /= np.linalg.norm(features, axis=-1, keepdims=True)
+    metrics.IMAGES_EMBEDDED.inc(len(features))
+    return features
+
+
+def _embed_local(image_files) -> np.ndarray:
+    """Encode images in-process with the configured backend."""
+    return encode_image_batch(preprocess_images(image_files))
+
+
+def _server_socket() -> str:
+    """Path of the shared CLIP server's socket, or "" when none is configured and live."""
+    socket_path = getattr(settings, "CLIP_SERVER_SOCKET", "")
+    return socket_path if socket_path and os.path.exists(socket_path) else ""
+
+
+def _embed_remote(image_files) -> Optional[np.ndarray]:
+    """Encode images through the shared CLIP server, or return None if it is absent."""
+    socket_path = _server_socket()
+    if not socket_path:
+        return None
+
+    from .clip_server import embed_remote
+
+    # Enforce the pixel limit here too, so oversized uploads fail the same way
+    for image_file in image_files:
+        _open_image(image_file)
+
+    try:
+        # The server process counts the images it embeds itself
+        with metrics.span("encode"):
+            return embed_remote(image_files, socket_path, getattr(settings, "CLIP_SERVER_TIMEOUT", 30.0))
+    except OSError as exc:
+        logger.warning("CLIP server at %s unavailable, using in-process model: %s", socket_path, exc)
+        return None
+
+
 def extract_features(image_file) -> np.ndarray:
     """Extract normalized CLIP features for the supplied image."""
-    model, preprocess = load_clip_model()
-    device = get_device()
+    return extract_features_batch([image_file])[0]
+
+
+def extract_features_batch(image_files) -> np.ndarray:
+    """Extract normalized CLIP features for several images in one forward pass.
 
-    image = _prepare_image(image_file)
-    image_tensor = preprocess(image).unsqueeze(0).to(device)
+    Uses the shared CLIP server when ``CLIP_SERVER_SOCKET`` points at a live
+    socket, and the in-process model otherwise.
+    """
+    features = _embed_remote(image_files)
+    if features is None:
+        features = _embed_local(image_files)
+    return features
 
+
+def load_text_encoder() -> Tuple["torch.nn.Module", "clip.model.CLIP"]:
+    """Load the model that encodes text queries.
+
+    Only the image tower has ONNX and INT8 variants, so text always runs on
+    the eager torch model, whatever ``CLIP_BACKEND`` is.
+    """
+    return load_clip_model()
+
+
+def encode_text_batch(texts) -> np.ndarray:
+    """Encode text queries in-process into L2-normalized float32 features."""
+    import clip
+    import torch
+
+    model, _ = load_text_encoder()
+    tokens = clip.tokenize(list(texts), truncate=True).to(get_device())
     with torch.no_grad():
-        features = model.encode_image(image_tensor)
-        features = features / features.norm(dim=-1, keepdim=True)
+        features = model.encode_text(tokens).float().cpu().numpy()
+
+    features = features.astype(np.float32)
+    features /= np.linalg.norm(features, axis=-1, keepdims=True)
+    return features
+
+
+def _encode_text_remote(text: str) -> Optional[np.ndarray]:
+    """Encode a text query through the shared CLIP server, or return None if it is absent."""
+    socket_path = _server_socket()
+    if not socket_path:
+        return None
+
+    from .clip_server import embed_text_remote
+
+    try:
+        with metrics.span("encode"):
+            return embed_text_remote([text], socket_path, getattr(settings, "CLIP_SERVER_TIMEOUT", 30.0))[0]
+    except OSError as exc:
+        logger.warning("CLIP server at %s unavailable, using in-process model: %s", socket_path, exc)
+        return None
 
-    return features.detach().cpu().numpy().astype(np.float32).flatten()
+
+def _encode_text_uncached(text: str) -> np.ndarray:
+    features = _encode_text_remote(text)
+    if features is None:
+        features = encode_text_batch([text])[0]
+    features.flags.writeable = False  # shared by every caller of the cache
+    return features
+
+
+def _get_text_cache():
+    """LRU cache of text embeddings, sized by ``CLIP_TEXT_CACHE_SIZE`` on first use."""
+    global _text_cache
+    if _text_cache is None:
+        _text_cache = lru_cache(maxsize=getattr(settings, "CLIP_TEXT_CACHE_SIZE", 1024))(_encode_text_uncached)
+    return _text_cache
+
+
+def encode_text(text: str) -> np.ndarray:
+    """Return the normalized CLIP embedding of a text query.
+
+    Uses the shared CLIP server when ``CLIP_SERVER_SOCKET`` points at a live
+    socket, and the in-process model otherwise. The CLIP tokenizer
+    lowercases and collapses whitespace, so queries are normalized the same
+    way before the LRU cache lookup to raise hit rates.
+    """
+    return _get_text_cache()(" ".join(text.split()).lower())
 
 
 def features_to_json(features: np.ndarray) -> str:
@@ -90,3 +401,21 @@ def features_to_json(features: np.ndarray) -> str:
 def json_to_features(json_str: str) -> np.ndarray:
     """Deserialize JSON feature vector to numpy array."""
     return np.array(json.loads(json_str), dtype=np.float32)
+
+
+def features_to_bytes(features: np.ndarray, dtype: Optional[str] = None) -> bytes:
+    """Serialize feature vector to raw float32/float16 bytes with a dtype/dim header."""
+    dtype = np.dtype(dtype or getattr(settings, "FEATURE_VECTOR_DTYPE", "float32")).newbyteorder("<")
+    if dtype not in _VECTOR_DTYPE_CODES:
+        raise ValueError(f"Unsupported feature vector dtype: {dtype}")
+    data = np.ascontiguousarray(features, dtype=dtype).ravel()
+    header = _VECTOR_HEADER.pack(_VECTOR_MAGIC, _VECTOR_VERSION, _VECTOR_DTYPE_CODES[dtype], data.shape[0])
+    return header + data.tobytes()
+
+
+def bytes_to_features(blob) -> np.ndarray:
+    """Zero-copy, read-only view of a binary feature vector in its stored dtype."""
+    magic, version, code, dimension = _VECTOR_HEADER.unpack_from(blob)
+    if magic != _VECTOR_MAGIC or version != _VECTOR_VERSION or code not in _VECTOR_DTYPES:
+        raise ValueError("Not a binary feature vector")
+    return np.frombuffer(blob, dtype=_VECTOR_DTYPES[code], count=dimension, offset=_VECTOR_HEADER.size)
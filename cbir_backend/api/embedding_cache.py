@@ -0,0 +1,85 @@
+"""Persistent embedding cache keyed by image content hash and model id.
+
+Uploads and the dataset scripts consult it before running CLIP, so bytes
+that were embedded once (re-imports, copied files, dataset images uploaded
+by users) never go through the model again. The model id
+(``clip_utils.embedding_model_id``) names the CLIP weights, the encoder
+backend and the preprocessing version, so switching ``CLIP_BACKEND`` or
+changing preprocessing never serves vectors made another way.
+"""
+
+import hashlib
+import logging
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+from . import metrics
+from .clip_utils import bytes_to_features, embedding_model_id, extract_features, features_to_bytes
+from .search_cache import hash_file
+
+logger = logging.getLogger(__name__)
+
+# Keeps IN (...) lookups below SQLite's bound-parameter limit
+LOOKUP_CHUNK_SIZE = 500
+
+
+def hash_path(path) -> str:
+    """Return the SHA-256 hex digest of a file on disk."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def lookup_embeddings(content_hashes: Iterable[str], model_id: Optional[str] = None) -> Dict[str, np.ndarray]:
+    """Return the cached embeddings among ``content_hashes`` as ``{hash: vector}``."""
+    from .models import EmbeddingCache
+
+    model_id = model_id or embedding_model_id()
+    wanted = list(dict.fromkeys(content_hashes))
+    found: Dict[str, np.ndarray] = {}
+
+    with metrics.span("embedding_cache"):
+        for start in range(0, len(wanted), LOOKUP_CHUNK_SIZE):
+            rows = EmbeddingCache.objects.filter(
+                model_id=model_id, content_hash__in=wanted[start:start + LOOKUP_CHUNK_SIZE]
+            ).values_list("content_hash", "feature_vector")
+            for content_hash, blob in rows:
+                found[content_hash] = bytes_to_features(blob)
+    metrics.EMBEDDING_CACHE.inc(len(found), result="hit")
+    metrics.EMBEDDING_CACHE.inc(len(wanted) - len(found), result="miss")
+    return found
+
+
+def lookup_embedding(content_hash: str, model_id: Optional[str] = None) -> Optional[np.ndarray]:
+    """Return the cached embedding for one content hash, if any."""
+    return lookup_embeddings([content_hash], model_id).get(content_hash)
+
+
+def store_embeddings(embeddings: Dict[str, np.ndarray], model_id: Optional[str] = None) -> None:
+    """Persist ``{hash: vector}`` pairs, ignoring hashes that are already cached."""
+    from .models import EmbeddingCache
+
+    model_id = model_id or embedding_model_id()
+    EmbeddingCache.objects.bulk_create(
+        [
+            EmbeddingCache(content_hash=content_hash, model_id=model_id, feature_vector=features_to_bytes(vector))
+            for content_hash, vector in embeddings.items()
+        ],
+        batch_size=LOOKUP_CHUNK_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def extract_features_cached(image_file, content_hash: Optional[str] = None) -> np.ndarray:
+    """Like ``extract_features`` but served from the cache when the bytes are known."""
+    content_hash = content_hash or hash_file(image_file)
+    features = lookup_embedding(content_hash)
+    if features is not None:
+        return features.astype(np.float32)
+
+    features = extract_features(image_file)
+    store_embeddings({content_hash: features})
+    return features
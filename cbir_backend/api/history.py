@@ -0,0 +1,153 @@
+"""Buffered search history writes.
+
+Search views call ``record_searches`` instead of inserting ``SearchHistory``
+rows themselves. Events go into an in-process buffer that a background
+thread writes with one ``bulk_create`` once ``SEARCH_HISTORY_FLUSH_SIZE``
+events are waiting or ``SEARCH_HISTORY_FLUSH_INTERVAL`` seconds have
+passed, and once more at interpreter exit (gunicorn's ``worker_exit``
+flushes too). Search latency therefore no longer includes a database
+write, and SQLite takes one write lock per batch instead of per search.
+
+The buffer holds at most ``SEARCH_HISTORY_MAX_BUFFER`` events; under
+overload newer events are dropped and counted rather than letting memory
+grow. Setting the interval to 0 writes synchronously, as before.
+"""
+
+import atexit
+import logging
+import os
+import threading
+from collections import Counter, deque
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# (user_id, results_count, query_image_id, searched_at)
+Event = Tuple[int, int, Optional[int], datetime]
+
+_buffer: deque = deque()
+_buffer_lock = threading.Lock()
+# Serializes flushes between the background thread and atexit/worker_exit
+_flush_lock = threading.Lock()
+_wakeup = threading.Event()
+_flusher_pid: Optional[int] = None
+
+EVENTS = metrics.Counter("cbir_search_history_events_total", "Search history events by outcome.", ("outcome",))
+
+
+def _flush_size() -> int:
+    return getattr(settings, "SEARCH_HISTORY_FLUSH_SIZE", 200)
+
+
+def _flush_interval() -> float:
+    return getattr(settings, "SEARCH_HISTORY_FLUSH_INTERVAL", 2.0)
+
+
+def _max_buffer() -> int:
+    return getattr(settings, "SEARCH_HISTORY_MAX_BUFFER", 10000)
+
+
+def _write(events: List[Event]) -> None:
+    from . import stats
+    from .models import SearchHistory
+
+    SearchHistory.objects.bulk_create(
+        [SearchHistory(user_id=user_id, results_count=count, query_image_id=image_id, searched_at=searched_at)
+         for user_id, count, image_id, searched_at in events],
+        batch_size=500,
+    )
+    # Count each search on its own day, even if it was flushed after midnight
+    days = Counter(timezone.localdate(searched_at) for _, _, _, searched_at in events)
+    for day, count in days.items():
+        stats.record("searches", count, when=day)
+
+
+def flush() -> int:
+    """Write every buffered event now; return how many were written."""
+    with _flush_lock:
+        with _buffer_lock:
+            events = list(_buffer)
+            _buffer.clear()
+        if not events:
+            return 0
+        try:
+            _write(events)
+        except Exception:  # pylint: disable=broad-except
+            # A failed batch is dropped: retrying could pile up behind a dead database
+            EVENTS.inc(len(events), outcome="failed")
+            logger.exception("Dropped %d search history events after a failed write", len(events))
+            return 0
+        EVENTS.inc(len(events), outcome="written")
+        return len(events)
+
+
+def _flush_loop() -> None:
+    while True:
+        _wakeup.wait(_flush_interval())
+        _wakeup.clear()
+        flush()
+
+
+def _ensure_flusher() -> None:
+    """Start the flush thread once per process (forked workers need their own)."""
+    global _flusher_pid
+
+    pid = os.getpid()
+    if _flusher_pid == pid:
+        return
+    with _buffer_lock:
+        if _flusher_pid == pid:
+            return
+        threading.Thread(target=_flush_loop, name="search-history-flusher", daemon=True).start()
+        _flusher_pid = pid
+
+
+def record_searches(user, results_counts: Iterable[int], query_image=None) -> None:
+    """Queue one history row per results count for ``user``."""
+    image_id = query_image.pk if query_image is not None else None
+    now = timezone.now()
+    events = [(user.pk, count, image_id, now) for count in results_counts]
+    if _flush_interval() <= 0:
+        _write(events)
+        return
+
+    _ensure_flusher()
+    with _buffer_lock:
+        room = _max_buffer() - len(_buffer)
+        accepted = events[:max(room, 0)]
+        _buffer.extend(accepted)
+        dropped = len(events) - len(accepted)
+        pending = len(_buffer)
+    if dropped:
+        EVENTS.inc(dropped, outcome="dropped")
+        logger.warning("Search history buffer full; dropped %d events (%d so far)",
+                       dropped, EVENTS.value(outcome="dropped"))
+    if pending >= _flush_size():
+        _wakeup.set()
+
+
+def record_search(user, results_count: int, query_image=None) -> None:
+    record_searches(user, [results_count], query_image)
+
+
+def buffer_stats() -> dict:
+    """Counters of this process's buffer, for logs and monitoring."""
+    with _buffer_lock:
+        pending = len(_buffer)
+    counts = {outcome: EVENTS.value(outcome=outcome) for outcome in ("written", "dropped", "failed")}
+    return {"pending": pending, **counts}
+
+
+def _pending() -> dict:
+    with _buffer_lock:
+        return {(): len(_buffer)}
+
+
+metrics.register_gauge("cbir_search_history_pending", "Search history events waiting to be written.", _pending)
+atexit.register(flush)
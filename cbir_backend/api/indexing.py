@@ -0,0 +1,222 @@
+"""Parallel bulk indexing of dataset images.
+
+A pool of worker processes reads, hashes and decodes images to CLIP's
+224x224 input while the main process runs batched inference on the
+previous batch, in the spirit of a PyTorch ``DataLoader`` with
+``num_workers`` and ``prefetch_factor``. Results are written back with one
+``bulk_update`` per batch and shared with the content-hash embedding cache.
+
+Pending rows are streamed by primary key (keyset pagination), so memory
+stays flat whatever the corpus size. After each committed batch a JSON
+checkpoint records the last primary key reached and a quarantine of files
+that failed; a rerun resumes from there and skips quarantined rows.
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+from collections import deque
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from django.db import transaction
+
+from .clip_utils import _prepare_image, encode_image_batch, features_to_bytes, normalize_pixels
+from .embedding_cache import hash_path, lookup_embeddings, store_embeddings
+from .search_engine import SOURCE_DATASET, bump_vector_version
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 32
+# Batches decoded ahead of inference; bounds memory like DataLoader's prefetch_factor
+DEFAULT_PREFETCH = 2
+# Rows fetched per keyset page of pending images
+PAGE_SIZE = 1000
+
+
+def default_workers() -> int:
+    """Leave one core to the inference loop."""
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+def _init_worker() -> None:
+    # Spawned (non-forked) workers start without Django configured
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+
+def _load_image(item: Tuple[int, str]) -> Tuple[int, Optional[str], Optional[np.ndarray], Optional[str]]:
+    """Hash and decode one image in a worker; return (pk, hash, uint8 pixels, error)."""
+    pk, path = item
+    try:
+        content_hash = hash_path(path)
+        pixels = np.asarray(_prepare_image(path))
+    except Exception as exc:  # pylint: disable=broad-except
+        return pk, None, None, str(exc)
+    return pk, content_hash, pixels, None
+
+
+def _chunks(items: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def load_batches(items: Iterable[Tuple[int, str]], batch_size: int, workers: int,
+                 prefetch: int = DEFAULT_PREFETCH) -> Iterator[List]:
+    """Yield decoded batches, keeping at most ``prefetch`` batches in flight.
+
+    ``workers=0`` decodes in the calling process.
+    """
+    if workers <= 0:
+        for chunk in _chunks(items, batch_size):
+            yield [_load_image(item) for item in chunk]
+        return
+
+    with multiprocessing.Pool(workers, initializer=_init_worker) as pool:
+        pending = deque()
+        for chunk in _chunks(items, batch_size):
+            pending.append(pool.map_async(_load_image, chunk))
+            if len(pending) > prefetch:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+def encode_batch(loaded: List) -> Tuple[dict, dict]:
+    """Embed one decoded batch; return ({pk: vector}, {pk: error})."""
+    errors = {pk: error for pk, _, _, error in loaded if error is not None}
+    ok = [entry for entry in loaded if entry[3] is None]
+
+    known = lookup_embeddings([content_hash for _, content_hash, _, _ in ok])
+    vectors = {pk: known[content_hash] for pk, content_hash, _, _ in ok if content_hash in known}
+
+    misses = [entry for entry in ok if entry[1] not in known]
+    if misses:
+        features = encode_image_batch(normalize_pixels(np.stack([pixels for _, _, pixels, _ in misses])))
+        fresh = {}
+        for (pk, content_hash, _, _), vector in zip(misses, features):
+            vectors[pk] = vector
+            fresh[content_hash] = vector
+        store_embeddings(fresh)
+    return vectors, errors
+
+
+def load_checkpoint(path: Optional[str]) -> dict:
+    """Read a checkpoint, or return a fresh one if ``path`` is unset or missing."""
+    state = {"last_pk": 0, "quarantine": {}}
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as handle:
+            state.update(json.load(handle))
+    return state
+
+
+def save_checkpoint(path: Optional[str], state: dict) -> None:
+    """Write the checkpoint atomically: a crash leaves the old or the new file, never half of one."""
+    if not path:
+        return
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".checkpoint-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            json.dump(state, handle)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def iter_pending(after_pk: int, quarantine: Dict[str, str], page_size: int = PAGE_SIZE) -> Iterator[Tuple[int, str]]:
+    """Stream (pk, path) of dataset images without a vector, in primary-key order."""
+    from .models import DatasetImage
+
+    storage = DatasetImage._meta.get_field("image").storage
+    last_pk = after_pk
+    while True:
+        page = list(
+            DatasetImage.objects.filter(feature_vector__isnull=True, pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", "image")[:page_size]
+        )
+        if not page:
+            return
+        for pk, name in page:
+            if str(pk) not in quarantine:
+                yield pk, storage.path(name)
+        last_pk = page[-1][0]
+
+
+def index_dataset(batch_size: int = DEFAULT_BATCH_SIZE, workers: Optional[int] = None,
+                  prefetch: int = DEFAULT_PREFETCH, checkpoint: Optional[str] = None, restart: bool = False,
+                  retry_quarantined: bool = False, progress: Optional[Callable[[dict], None]] = None) -> dict:
+    """Embed every ``DatasetImage`` without a feature vector.
+
+    With ``checkpoint`` set, progress is saved after every committed batch
+    and an interrupted run resumes after the last primary key reached
+    (``restart`` scans from the beginning instead).
+    ``progress`` is called with the running totals after each batch.
+    Returns the final totals, including ``images_per_sec``.
+    """
+    from .models import DatasetImage
+
+    workers = default_workers() if workers is None else workers
+    state = load_checkpoint(checkpoint)
+    if restart:
+        state["last_pk"] = 0
+    if retry_quarantined:
+        state["quarantine"] = {}
+    if state["last_pk"]:
+        logger.info("Resuming dataset indexing after pk %s", state["last_pk"])
+
+    pending = DatasetImage.objects.filter(feature_vector__isnull=True, pk__gt=state["last_pk"])
+    stats = {
+        "total": pending.count() - sum(1 for pk in state["quarantine"] if int(pk) > state["last_pk"]),
+        "processed": 0, "errors": 0, "seconds": 0.0, "images_per_sec": 0.0,
+    }
+    started = time.perf_counter()
+    batches = load_batches(iter_pending(state["last_pk"], state["quarantine"]), batch_size, workers, prefetch)
+    try:
+        for loaded in batches:
+            vectors, errors = encode_batch(loaded)
+            with transaction.atomic():
+                DatasetImage.objects.bulk_update(
+                    [DatasetImage(pk=pk, feature_vector=features_to_bytes(vector)) for pk, vector in vectors.items()],
+                    ["feature_vector"],
+                )
+                # bulk_update sends no signals
+                bump_vector_version(SOURCE_DATASET)
+            for pk, error in errors.items():
+                logger.warning("Quarantined dataset image %s: %s", pk, error)
+                state["quarantine"][str(pk)] = error
+            state["last_pk"] = max(pk for pk, _, _, _ in loaded)
+            save_checkpoint(checkpoint, state)
+
+            stats["processed"] += len(vectors)
+            stats["errors"] += len(errors)
+            stats["seconds"] = time.perf_counter() - started
+            stats["images_per_sec"] = stats["processed"] / stats["seconds"] if stats["seconds"] else 0.0
+            if progress:
+                progress(dict(stats))
+    finally:
+        # Stops the decode pool promptly if inference or the database fails
+        batches.close()
+
+    # A finished pass rescans from the start next time; the quarantine is kept
+    state["last_pk"] = 0
+    save_checkpoint(checkpoint, state)
+    stats["quarantined"] = len(state["quarantine"])
+    return stats
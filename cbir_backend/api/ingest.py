@@ -0,0 +1,181 @@
+"""Durable, database-backed ingestion queue for uploaded images.
+
+``ImageUploadView`` can store an upload and enqueue an ``IngestJob``
+instead of running CLIP inside the request. The ``ingest_worker``
+management command claims jobs in priority order, embeds them in
+batches and writes the vectors back to ``Image.feature_vector``.
+"""
+
+import logging
+import os
+import socket
+from datetime import timedelta
+from typing import List
+
+from django.db import transaction
+from django.utils import timezone
+
+from .clip_utils import _prepare_image, extract_features_batch, features_to_bytes
+from .embedding_cache import hash_path, lookup_embeddings, store_embeddings
+from .search_engine import SOURCE_UPLOAD, bump_vector_version
+from .thumbnails import generate_thumbnails
+
+logger = logging.getLogger(__name__)
+
+
+def worker_id() -> str:
+    """Identify this worker process in ``IngestJob.locked_by``."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue_image(image, priority=None):
+    """Queue feature extraction for ``image``."""
+    from .models import IngestJob
+
+    if priority is None:
+        priority = IngestJob.PRIORITY_INTERACTIVE
+    return IngestJob.objects.create(image=image, priority=priority)
+
+
+def enqueue_missing(priority=None) -> int:
+    """Queue backfill jobs for images without vectors or an open job."""
+    from .models import Image, IngestJob
+
+    if priority is None:
+        priority = IngestJob.PRIORITY_BACKFILL
+    images = Image.objects.filter(feature_vector__isnull=True).exclude(
+        ingest_jobs__status__in=['pending', 'running']
+    )
+    jobs = [IngestJob(image=image, priority=priority) for image in images.only('id')]
+    IngestJob.objects.bulk_create(jobs, batch_size=500)
+    return len(jobs)
+
+
+def requeue_stale(lease_seconds: int, max_attempts: int = 3) -> int:
+    """Return jobs whose worker died mid-batch to the queue; return how many.
+
+    An expired lease counts as a failed attempt, so an image that keeps
+    crashing or hanging the worker ends up ``failed`` like any other.
+    """
+    from django.db.models import F
+
+    from .models import IngestJob
+
+    now = timezone.now()
+    stale = IngestJob.objects.filter(status='running', locked_at__lt=now - timedelta(seconds=lease_seconds))
+    released = {'attempts': F('attempts') + 1, 'locked_by': '', 'locked_at': None, 'updated_at': now}
+    with transaction.atomic():
+        failed = stale.filter(attempts__gte=max_attempts - 1).update(
+            status='failed', error=f"Worker lease expired after {lease_seconds}s", **released
+        )
+        requeued = stale.update(status='pending', **released)
+    if failed:
+        logger.warning("Marked %d jobs failed: worker lease expired on their last of %d attempts", failed, max_attempts)
+    return requeued
+
+
+def claim_jobs(owner: str, batch_size: int) -> List:
+    """Atomically claim up to ``batch_size`` due jobs, highest priority first."""
+    from .models import IngestJob
+
+    now = timezone.now()
+    with transaction.atomic():
+        candidate_ids = list(
+            IngestJob.objects.filter(status='pending', available_at__lte=now)
+            .order_by('priority', 'created_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not candidate_ids:
+            return []
+        # Only rows still pending are taken, so concurrent workers never share a job
+        IngestJob.objects.filter(id__in=candidate_ids, status='pending').update(
+            status='running', locked_by=owner, locked_at=now
+        )
+    return list(
+        IngestJob.objects.filter(id__in=candidate_ids, status='running', locked_by=owner)
+        .select_related('image')
+        .order_by('priority', 'created_at')
+    )
+
+
+def _fail(job, error: str, max_attempts: int) -> None:
+    job.attempts += 1
+    job.error = error
+    job.locked_by = ''
+    job.locked_at = None
+    if job.attempts >= max_attempts:
+        job.status = 'failed'
+    else:
+        job.status = 'pending'
+        job.available_at = timezone.now() + timedelta(seconds=2 ** job.attempts)
+    job.save(update_fields=['attempts', 'error', 'status', 'available_at', 'locked_by', 'locked_at', 'updated_at'])
+
+
+def process_jobs(jobs, max_attempts: int = 3) -> int:
+    """Embed the images of claimed jobs in one batch; return how many succeeded."""
+    from .models import Image, IngestJob
+
+    hashes = {}
+    for job in jobs:
+        try:
+            hashes[job.id] = hash_path(job.image.image.path)
+        except (OSError, ValueError) as exc:
+            _fail(job, f"Cannot read image: {exc}", max_attempts)
+    known = lookup_embeddings(hashes.values())
+
+    features = {}
+    to_encode = []
+    prepared = []
+    for job in jobs:
+        if job.id not in hashes:
+            continue
+        if hashes[job.id] in known:
+            features[job.id] = known[hashes[job.id]]
+            continue
+        try:
+            prepared.append(_prepare_image(job.image.image.path))
+            to_encode.append(job)
+        except Exception as exc:  # pylint: disable=broad-except
+            _fail(job, f"Cannot decode image: {exc}", max_attempts)
+
+    if to_encode:
+        try:
+            encoded = extract_features_batch(prepared)
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.exception("Batch embedding failed")
+            for job in to_encode:
+                _fail(job, f"Embedding failed: {exc}", max_attempts)
+            encoded = []
+        for job, vector in zip(to_encode, encoded):
+            features[job.id] = vector
+        store_embeddings({hashes[job.id]: features[job.id] for job in to_encode if job.id in features})
+
+    done = [job for job in jobs if job.id in features]
+    if not done:
+        return 0
+
+    images = []
+    now = timezone.now()
+    for job in done:
+        job.image.feature_vector = features_to_bytes(features[job.id])
+        try:
+            job.image.content_hash = generate_thumbnails(job.image.image.path, hashes[job.id],
+                                                            owner_id=job.image.user_id)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Thumbnail generation failed for image %s", job.image.id)
+        images.append(job.image)
+        job.status = 'done'
+        job.error = ''
+        job.locked_by = ''
+        job.locked_at = None
+        job.updated_at = now
+
+    with transaction.atomic():
+        Image.objects.bulk_update(images, ['feature_vector', 'content_hash'])
+        IngestJob.objects.bulk_update(done, ['status', 'error', 'locked_by', 'locked_at', 'updated_at'])
+        # bulk_update sends no signals
+        bump_vector_version(SOURCE_UPLOAD)
+
+    # Web workers pick the vectors up through their fingerprint checks, and
+    # the new fingerprint retires their cached search results.
+    return len(done)
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.clip_export import check_agreement, sample_images
+from api.clip_utils import CLIP_BACKENDS
+
+
+class Command(BaseCommand):
+    help = "Checks that a CLIP backend produces embeddings interchangeable with eager torch."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--backend", choices=CLIP_BACKENDS, default=settings.CLIP_BACKEND,
+                            help="Backend to compare with eager torch (defaults to CLIP_BACKEND).")
+        parser.add_argument("--samples", type=int, default=32, help="Images used for the comparison.")
+        parser.add_argument("--min-cosine", type=float, default=settings.CLIP_BACKEND_MIN_COSINE,
+                            help="Fail if any sample's cosine similarity to torch falls below this.")
+
+    def handle(self, *args, **options):
+        agreement = check_agreement(options["backend"], sample_images(options["samples"]))
+        self.stdout.write(
+            f"🔍 {options['backend']} vs torch over {options['samples']} images: "
+            f"min cosine {agreement['min_cosine']:.5f}, mean {agreement['mean_cosine']:.5f}"
+        )
+        if agreement["min_cosine"] < options["min_cosine"]:
+            raise CommandError(f"{options['backend']} disagrees with torch (min cosine < {options['min_cosine']})")
+        self.stdout.write(self.style.SUCCESS(f"✅ {options['backend']} backend matches torch embeddings"))
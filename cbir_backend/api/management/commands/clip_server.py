@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.clip_server import ClipServer
+
+
+class Command(BaseCommand):
+    help = "Serves CLIP image and text embeddings to every worker over a Unix socket, batching concurrent requests."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--socket", default=settings.CLIP_SERVER_SOCKET or "/tmp/cbir-clip.sock",
+                            help="Unix socket path (set CLIP_SERVER_SOCKET to the same path for the web app).")
+        parser.add_argument("--max-batch", type=int, default=32, help="Maximum images per forward pass.")
+        parser.add_argument("--max-wait-ms", type=float, default=10.0,
+                            help="Longest time a request waits for a batch to fill.")
+
+    def handle(self, *args, **options):
+        server = ClipServer(options["socket"], options["max_batch"], options["max_wait_ms"])
+        self.stdout.write(f"🚀 CLIP server starting on {options['socket']}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS("✅ CLIP server stopped"))
@@ -0,0 +1,50 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.clip_export import check_agreement, export_onnx, quantize_onnx, sample_images
+
+
+class Command(BaseCommand):
+    help = "Exports the CLIP image encoder to ONNX and checks it against the torch embeddings."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", default=settings.CLIP_ONNX_PATH, help="Destination .onnx file.")
+        parser.add_argument("--opset", type=int, default=17, help="ONNX opset version.")
+        parser.add_argument("--quantize", action="store_true",
+                            help="Also write an INT8 dynamically quantized <output>.int8.onnx.")
+        parser.add_argument("--samples", type=int, default=32, help="Images used for the agreement check.")
+        parser.add_argument("--min-cosine", type=float, default=settings.CLIP_BACKEND_MIN_COSINE,
+                            help="Fail if any sample's cosine similarity to torch falls below this.")
+        parser.add_argument("--skip-verify", action="store_true", help="Skip the agreement check.")
+
+    def handle(self, *args, **options):
+        outputs = [export_onnx(options["output"], options["opset"])]
+        self.stdout.write(f"📦 Exported {outputs[0]}")
+
+        if options["quantize"]:
+            stem, _ = os.path.splitext(options["output"])
+            outputs.append(quantize_onnx(options["output"], f"{stem}.int8.onnx"))
+            self.stdout.write(f"📦 Quantized {outputs[-1]}")
+
+        if options["skip_verify"]:
+            return
+
+        images = sample_images(options["samples"])
+        failed = []
+        for path in outputs:
+            agreement = check_agreement("onnx", images, onnx_path=path)
+            self.stdout.write(
+                f"🔍 {os.path.basename(path)}: min cosine {agreement['min_cosine']:.5f}, "
+                f"mean {agreement['mean_cosine']:.5f}"
+            )
+            if agreement["min_cosine"] < options["min_cosine"]:
+                failed.append(path)
+
+        if failed:
+            raise CommandError(
+                f"Embeddings from {', '.join(failed)} disagree with torch (min cosine < {options['min_cosine']}); "
+                "do not deploy them against the existing index"
+            )
+        self.stdout.write(self.style.SUCCESS("✅ ONNX encoder matches torch embeddings"))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from api.indexing import default_workers
+from api.thumbnails import backfill_thumbnails, thumbnail_sizes
+
+
+class Command(BaseCommand):
+    help = "Generates WebP thumbnails for uploaded and dataset images that do not have them yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=None,
+                            help="Worker processes (default: CPU count - 1; 0 runs in-process).")
+        parser.add_argument("--batch-size", type=int, default=200, help="Rows fetched and updated per batch.")
+        parser.add_argument("--force", action="store_true", help="Regenerate thumbnails for every image.")
+
+    def handle(self, *args, **options):
+        workers = default_workers() if options["workers"] is None else options["workers"]
+        sizes = ", ".join(str(size) for size in thumbnail_sizes())
+        self.stdout.write(f"🖼️ Generating {sizes}px thumbnails with {workers} workers")
+
+        def report(stats):
+            self.stdout.write(f"  ✅ {stats['processed']} done, {stats['errors']} errors")
+
+        stats = backfill_thumbnails(workers, options["batch_size"], options["force"], progress=report)
+        self.stdout.write(self.style.SUCCESS(
+            f"🎯 Thumbnails ready for {stats['processed']} images, {stats['errors']} errors"
+        ))
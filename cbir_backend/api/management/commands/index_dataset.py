@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api import indexing
+
+
+class Command(BaseCommand):
+    help = "Embeds dataset images that have no feature vector, decoding in parallel worker processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=indexing.DEFAULT_BATCH_SIZE,
+                            help="Images per forward pass.")
+        parser.add_argument("--workers", type=int, default=None,
+                            help="Decode processes (default: CPU count - 1; 0 decodes in-process).")
+        parser.add_argument("--prefetch", type=int, default=indexing.DEFAULT_PREFETCH,
+                            help="Batches decoded ahead of inference.")
+        parser.add_argument("--checkpoint", default=settings.INDEX_CHECKPOINT_PATH,
+                            help="Progress file used to resume an interrupted run.")
+        parser.add_argument("--no-checkpoint", action="store_true", help="Do not read or write a checkpoint.")
+        parser.add_argument("--restart", action="store_true",
+                            help="Scan from the first pending image instead of resuming.")
+        parser.add_argument("--retry-quarantined", action="store_true",
+                            help="Retry images that failed on earlier runs.")
+
+    def handle(self, *args, **options):
+        workers = indexing.default_workers() if options["workers"] is None else options["workers"]
+        self.stdout.write(f"🧠 Indexing dataset images (batch size {options['batch_size']}, {workers} workers)")
+
+        batches = 0
+
+        def report(stats):
+            nonlocal batches
+            batches += 1
+            if batches % 10 and stats["processed"] + stats["errors"] < stats["total"]:
+                return
+            self.stdout.write(
+                f"  ✅ {stats['processed']}/{stats['total']} done, {stats['errors']} errors "
+                f"({stats['images_per_sec']:.1f} images/sec)"
+            )
+
+        stats = indexing.index_dataset(
+            options["batch_size"], workers, options["prefetch"],
+            checkpoint=None if options["no_checkpoint"] else options["checkpoint"],
+            restart=options["restart"], retry_quarantined=options["retry_quarantined"], progress=report,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"🎯 Indexed {stats['processed']} images in {stats['seconds']:.1f}s "
+            f"({stats['images_per_sec']:.1f} images/sec), {stats['errors']} errors"
+        ))
+        if stats["quarantined"]:
+            self.stdout.write(f"🚧 {stats['quarantined']} images quarantined; rerun with --retry-quarantined "
+                              "after fixing them")
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api import ingest
+
+
+class Command(BaseCommand):
+    help = "Drains the upload ingestion queue, embedding queued images in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=16, help="Jobs embedded per forward pass.")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds to sleep when idle.")
+        parser.add_argument("--max-attempts", type=int, default=3, help="Attempts before a job is marked failed.")
+        parser.add_argument("--lease", type=int, default=600,
+                            help="Seconds after which a running job is considered abandoned.")
+        parser.add_argument("--enqueue-missing", action="store_true",
+                            help="Queue backfill jobs for images that have no feature vector.")
+        parser.add_argument("--once", action="store_true", help="Exit once the queue is empty.")
+
+    def handle(self, *args, **options):
+        owner = ingest.worker_id()
+
+        if options["enqueue_missing"]:
+            queued = ingest.enqueue_missing()
+            self.stdout.write(f"📥 Queued {queued} backfill jobs")
+
+        self.stdout.write(f"⚙️ Ingest worker {owner} started")
+        try:
+            while True:
+                requeued = ingest.requeue_stale(options["lease"], options["max_attempts"])
+                if requeued:
+                    self.stdout.write(f"♻️ Requeued {requeued} abandoned jobs")
+
+                jobs = ingest.claim_jobs(owner, options["batch_size"])
+                if not jobs:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll_interval"])
+                    continue
+
+                done = ingest.process_jobs(jobs, options["max_attempts"])
+                self.stdout.write(f"✅ Embedded {done}/{len(jobs)} queued images")
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS("✅ Ingest worker stopped"))
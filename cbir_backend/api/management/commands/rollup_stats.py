@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.stats import rollup
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the daily statistics rollup from the images, search history and users tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=None,
+                            help="Only rebuild this many most recent days (default: all history).")
+
+    def handle(self, *args, **options):
+        days = options["days"]
+        if days is not None and days < 1:
+            raise CommandError("--days must be at least 1.")
+
+        scope = f"the last {days} days" if days else "all history"
+        self.stdout.write(f"📊 Rebuilding daily stats for {scope}")
+        rows = rollup(days)
+        self.stdout.write(self.style.SUCCESS(f"🎯 Wrote {rows} daily rows"))
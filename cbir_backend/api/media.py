@@ -0,0 +1,233 @@
+"""Serving of ``MEDIA_ROOT`` in production.
+
+``serve_media`` replaces ``django.views.static.serve`` for ``/media/``:
+
+* strong ETag and Last-Modified validators with 304 responses;
+* ``Cache-Control: immutable`` for content-addressed thumbnails (``private``
+  for those of uploads);
+* single-range ``Range`` requests (206/416) honouring ``If-Range``;
+* ``MEDIA_SENDFILE = "x-sendfile"`` or ``"x-accel-redirect"`` hands the
+  byte transfer to Apache/lighttpd or nginx after the checks pass.
+
+Uploads live under ``images/<user_id>/`` and are private: they are served
+to their owner or an admin (JWT or session), or to anyone presenting the
+signature that ``media_url`` appends when the API hands the URL to one of
+them, so ``<img>`` tags keep working without an Authorization header.
+Signatures are timestamped and expire after ``MEDIA_SIGNATURE_MAX_AGE``.
+The timestamp is rounded down to a window of half that lifetime, so a
+file keeps one URL (and its browser cache entry) for the whole window and
+every URL still has at least half its lifetime left when handed out.
+"""
+
+import mimetypes
+import os
+import posixpath
+import re
+import time
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core import signing
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.encoding import filepath_to_uri
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+from .thumbnails import THUMBNAIL_DIR
+
+PRIVATE_PATH = re.compile(r"^images/(?P<user_id>\d+)/")
+IMMUTABLE_PATH = re.compile(rf"^(?:images/\d+/)?{THUMBNAIL_DIR}/\d+/[0-9a-f]{{2}}/(?P<hash>[0-9a-f]{{64}})\.webp$")
+RANGE_HEADER = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+
+
+def signature_window_seconds() -> int:
+    return max(settings.MEDIA_SIGNATURE_MAX_AGE // 2, 1)
+
+
+def signature_window() -> int:
+    """Id of the current signing window; media URLs change only when it does."""
+    return int(time.time()) // signature_window_seconds()
+
+
+class _WindowSigner(signing.TimestampSigner):
+    def timestamp(self):
+        return signing.b62_encode(signature_window() * signature_window_seconds())
+
+
+_signer = _WindowSigner(salt="api.media")
+
+
+def sign_name(name: str) -> str:
+    """Return the ``<timestamp>:<signature>`` part of ``name``'s signed value."""
+    return _signer.sign(name)[len(name) + len(_signer.sep):]
+
+
+def _may_sign(request, user_id: str) -> bool:
+    user = getattr(request, "user", None)
+    return bool(user and user.is_authenticated and (str(user.id) == user_id or user.is_admin()))
+
+
+def media_url(name: str, request=None) -> str:
+    """URL of a stored file.
+
+    Private uploads are signed only for their owner or an admin; anyone
+    else gets the bare URL, which ``serve_media`` refuses.
+    """
+    url = settings.MEDIA_URL + filepath_to_uri(name)
+    match = PRIVATE_PATH.match(name)
+    if match and _may_sign(request, match.group("user_id")):
+        url = f"{url}?sig={sign_name(name)}"
+    return request.build_absolute_uri(url) if request else url
+
+
+def _request_user(request):
+    """Authenticate with a Bearer token if present, else fall back to the session."""
+    from rest_framework.exceptions import AuthenticationFailed
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.exceptions import InvalidToken
+
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except (AuthenticationFailed, InvalidToken):
+        result = None
+    return result[0] if result else getattr(request, "user", None)
+
+
+def can_read(request, name: str) -> bool:
+    match = PRIVATE_PATH.match(name)
+    if not match:
+        return True
+
+    signature = request.GET.get("sig")
+    if signature:
+        try:
+            _signer.unsign(f"{name}{_signer.sep}{signature}", max_age=settings.MEDIA_SIGNATURE_MAX_AGE)
+            return True
+        except signing.BadSignature:
+            pass
+
+    user = _request_user(request)
+    if not user or not user.is_authenticated:
+        return False
+    return str(user.id) == match.group("user_id") or user.is_admin()
+
+
+def _etag(name: str, stat: os.stat_result) -> str:
+    immutable = IMMUTABLE_PATH.match(name)
+    if immutable:
+        return quote_etag(immutable.group("hash"))
+    return quote_etag(f"{stat.st_size:x}-{stat.st_mtime_ns:x}")
+
+
+def _cache_control(name: str) -> str:
+    scope = "private" if PRIVATE_PATH.match(name) else "public"
+    if IMMUTABLE_PATH.match(name):
+        return f"{scope}, max-age=31536000, immutable"
+    return f"{scope}, max-age={settings.MEDIA_CACHE_MAX_AGE}"
+
+
+def _not_modified(request, etag: str, mtime: int) -> bool:
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        return if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]
+    if_modified_since = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+    return if_modified_since is not None and mtime <= if_modified_since
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Return the inclusive byte span of a single-range header.
+
+    ``None`` means serve the whole file (no header, or a form we ignore such
+    as multiple ranges); ``ValueError`` means the range is unsatisfiable.
+    """
+    if not header:
+        return None
+    match = RANGE_HEADER.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":
+        length = int(last)
+        if length == 0:
+            raise ValueError("empty suffix range")
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("range outside the file")
+    return start, end
+
+
+def _read_span(path: str, start: int, end: int):
+    with open(path, "rb") as handle:
+        handle.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = handle.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                return
+            remaining -= len(chunk)
+            yield chunk
+
+
+def serve_media(request, path: str):
+    """Serve one file below ``MEDIA_ROOT`` (see the module docstring)."""
+    name = posixpath.normpath(path).lstrip("/")
+    full_path = safe_join(settings.MEDIA_ROOT, name)
+    if not os.path.isfile(full_path) or not can_read(request, name):
+        # Do not reveal whether a private file exists
+        raise Http404("Media file not found")
+
+    stat = os.stat(full_path)
+    mtime = int(stat.st_mtime)
+    etag = _etag(name, stat)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(mtime),
+        "Cache-Control": _cache_control(name),
+        "Accept-Ranges": "bytes",
+    }
+
+    if _not_modified(request, etag, mtime):
+        response = HttpResponseNotModified()
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or "application/octet-stream"
+
+    mode = getattr(settings, "MEDIA_SENDFILE", "")
+    if mode:
+        # The fronting server streams the bytes and handles Range itself
+        response = HttpResponse(content_type=content_type)
+        if mode == "x-accel-redirect":
+            response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_PREFIX.rstrip("/") + "/" + filepath_to_uri(name)
+        else:
+            response["X-Sendfile"] = full_path
+    else:
+        span = None
+        if_range = request.headers.get("If-Range")
+        if if_range is None or if_range.strip() in (etag, headers["Last-Modified"]):
+            try:
+                span = parse_range(request.headers.get("Range"), stat.st_size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response["Content-Range"] = f"bytes */{stat.st_size}"
+                return response
+
+        if span is None:
+            response = FileResponse(open(full_path, "rb"), content_type=content_type)
+        else:
+            start, end = span
+            response = StreamingHttpResponse(_read_span(full_path, start, end), status=206,
+                                             content_type=content_type)
+            response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+            response["Content-Length"] = str(end - start + 1)
+
+    if encoding:
+        response["Content-Encoding"] = encoding
+    for header, value in headers.items():
+        response[header] = value
+    return response
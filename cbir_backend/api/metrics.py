@@ -0,0 +1,249 @@
+"""Stage timings and counters, exported in Prometheus text format.
+
+``span("encode")`` times one stage of the work behind a request. Every
+span is observed into the ``cbir_stage_seconds`` histogram, and the spans
+of the current request (tracked in a context variable) are returned to
+the client by ``ServerTimingMiddleware`` as a ``Server-Timing`` header,
+which browser dev tools display per request. Repeated stages, such as
+decoding each image of a batch, are summed into one entry.
+
+Metrics live in the memory of each process: with several gunicorn
+workers, each scrape of ``/api/metrics`` reports the worker that served
+it. Run a single worker or scrape workers individually when exact totals
+matter.
+"""
+
+import bisect
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from django.urls import Resolver404, resolve
+
+# Latency buckets in seconds; the low end resolves cache hits and ORM lookups
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry: List["_Metric"] = []
+_gauges: List[Tuple[str, str, Callable[[], Dict[Tuple[str, ...], float]], Tuple[str, ...]]] = []
+_registry_lock = threading.Lock()
+
+# {stage: seconds} of the request being handled in this context, if any
+_request_spans: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "request_spans", default=None
+)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic count, e.g. ``cbir_images_embedded_total``."""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_number(value)}"
+                for key, value in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram of durations in seconds."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts (last one is +Inf), sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = {key: (list(counts), total, count) for key, (counts, total, count) in self._values.items()}
+        lines = []
+        for key, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_number(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+def register_gauge(name: str, documentation: str, collect: Callable[[], Dict[Tuple[str, ...], float]],
+                   labelnames: Sequence[str] = ()) -> None:
+    """Report ``collect()`` (``{label values: value}``) as a gauge on every scrape."""
+    with _registry_lock:
+        _gauges.append((name, documentation, collect, tuple(labelnames)))
+
+
+# ---------------------------------------------------------------------
+# Application metrics
+# ---------------------------------------------------------------------
+
+STAGE_SECONDS = Histogram("cbir_stage_seconds", "Time spent in one stage of a request or job.", ("stage",))
+REQUEST_SECONDS = Histogram("cbir_request_seconds", "End-to-end time of instrumented views.", ("view", "status"))
+IMAGES_EMBEDDED = Counter("cbir_images_embedded_total", "Images run through the CLIP image encoder.")
+SEARCH_CACHE = Counter("cbir_search_cache_requests_total", "Search result cache lookups.", ("result",))
+EMBEDDING_CACHE = Counter("cbir_embedding_cache_requests_total", "Embedding cache lookups by content hash.",
+                          ("result",))
+
+
+# ---------------------------------------------------------------------
+# Spans and Server-Timing
+# ---------------------------------------------------------------------
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time the enclosed block as ``stage``."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        spans = _request_spans.get()
+        if spans is not None:
+            spans[stage] = spans.get(stage, 0.0) + elapsed
+
+
+def timed(stage: str) -> Callable:
+    """Decorator form of ``span``."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def server_timing(spans: Dict[str, float], total: float) -> str:
+    """Format spans as a ``Server-Timing`` header value (milliseconds)."""
+    entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in spans.items()]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+def _view_name(request) -> str:
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return "unmatched"
+    return match.url_name or match.view_name or "unnamed"
+
+
+class ServerTimingMiddleware:
+    """Collect the spans of each request and report them in ``Server-Timing``.
+
+    Requests that recorded at least one span are also timed end to end in
+    ``cbir_request_seconds``, labelled by URL name so the series stay bounded.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _request_spans.set({})
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+            spans = _request_spans.get()
+        finally:
+            _request_spans.reset(token)
+
+        if spans:
+            total = time.perf_counter() - started
+            response["Server-Timing"] = server_timing(spans, total)
+            REQUEST_SECONDS.observe(total, view=_view_name(request), status=response.status_code)
+        return response
+
+
+# ---------------------------------------------------------------------
+# Exposition
+# ---------------------------------------------------------------------
+
+def render() -> str:
+    """All metrics of this process in Prometheus text exposition format 0.0.4."""
+    with _registry_lock:
+        metrics = list(_registry)
+        gauges = list(_gauges)
+
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    for name, documentation, collect, labelnames in gauges:
+        lines.append(f"# HELP {name} {documentation}")
+        lines.append(f"# TYPE {name} gauge")
+        for key, value in sorted(collect().items()):
+            lines.append(f"{name}{_format_labels(labelnames, key)} {_format_number(value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,99 @@
+# Generated by Django 5.0.1 on 2026-10-17 09:12
+
+import json
+import struct
+
+from django.db import migrations, models
+
+# Mirrors api.clip_utils.features_to_bytes at the time of this migration.
+VECTOR_HEADER = struct.Struct("<2sBBI")
+BATCH_SIZE = 500
+
+
+def _pack(value):
+    if isinstance(value, str):
+        value = json.loads(value)
+    data = struct.pack(f"<{len(value)}f", *value)
+    return VECTOR_HEADER.pack(b"FV", 1, 0, len(value)) + data
+
+
+def _unpack(blob):
+    magic, _, code, dimension = VECTOR_HEADER.unpack_from(blob)
+    fmt = "f" if code == 0 else "e"
+    return list(struct.unpack_from(f"<{dimension}{fmt}", blob, VECTOR_HEADER.size))
+
+
+def _convert(model, source, target, transform):
+    """Rewrite ``source`` into ``target`` in primary-key ordered batches."""
+    last_pk = 0
+    while True:
+        batch = list(
+            model.objects.filter(pk__gt=last_pk, **{f"{source}__isnull": False})
+            .order_by("pk")
+            .only("pk", source)[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for row in batch:
+            setattr(row, target, transform(getattr(row, source)))
+        model.objects.bulk_update(batch, [target])
+        last_pk = batch[-1].pk
+
+
+def vectors_to_binary(apps, schema_editor):
+    for name in ("Image", "DatasetImage"):
+        _convert(apps.get_model("api", name), "feature_vector", "feature_blob", _pack)
+
+
+def vectors_to_json(apps, schema_editor):
+    for name in ("Image", "DatasetImage"):
+        _convert(apps.get_model("api", name), "feature_blob", "feature_vector", _unpack)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datasetimage',
+            name='feature_blob',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='feature_blob',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.RunPython(vectors_to_binary, vectors_to_json),
+        migrations.RemoveField(
+            model_name='datasetimage',
+            name='feature_vector',
+        ),
+        migrations.RemoveField(
+            model_name='image',
+            name='feature_vector',
+        ),
+        migrations.RenameField(
+            model_name='datasetimage',
+            old_name='feature_blob',
+            new_name='feature_vector',
+        ),
+        migrations.RenameField(
+            model_name='image',
+            old_name='feature_blob',
+            new_name='feature_vector',
+        ),
+        migrations.AlterField(
+            model_name='datasetimage',
+            name='feature_vector',
+            field=models.BinaryField(blank=True, help_text='Stores CLIP feature vector as binary float32/float16 data', null=True),
+        ),
+        migrations.AlterField(
+            model_name='image',
+            name='feature_vector',
+            field=models.BinaryField(blank=True, help_text='Stores CLIP feature vector as binary float32/float16 data', null=True),
+        ),
+    ]
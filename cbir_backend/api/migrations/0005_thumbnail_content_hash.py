@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-17 02:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_ingest_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datasetimage',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', help_text='SHA-256 of the image bytes; set once its thumbnails exist', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', help_text='SHA-256 of the image bytes; set once its thumbnails exist', max_length=64),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.0.1 on 2026-10-17 02:35
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def backfill_daily_stats(apps, schema_editor):
+    """Seed the rollup from existing rows (same as `manage.py rollup_stats`)."""
+    DailyStat = apps.get_model('api', 'DailyStat')
+    sources = {
+        'uploads': (apps.get_model('api', 'Image'), 'uploaded_at'),
+        'searches': (apps.get_model('api', 'SearchHistory'), 'searched_at'),
+        'signups': (apps.get_model(settings.AUTH_USER_MODEL), 'date_joined'),
+    }
+    rows = {}
+    for counter, (model, field) in sources.items():
+        per_day = model.objects.annotate(day=TruncDate(field)).values('day').annotate(n=Count('pk')).order_by()
+        for row in per_day:
+            rows.setdefault(row['day'], DailyStat(date=row['day']))
+            setattr(rows[row['day']], counter, row['n'])
+    DailyStat.objects.bulk_create(rows.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_image_list_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('uploads', models.IntegerField(default=0)),
+                ('searches', models.IntegerField(default=0)),
+                ('signups', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'daily_stats',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.RunPython(backfill_daily_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.1 on 2026-10-17 02:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_daily_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VectorVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=16, unique=True)),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'vector_versions',
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.0.1 on 2026-10-17 11:40
+
+import os
+import shutil
+
+from django.conf import settings
+from django.db import migrations
+
+# Mirrors api.thumbnails.thumbnail_name at the time of this migration.
+THUMBNAIL_DIR = "thumbs"
+BATCH_SIZE = 500
+
+
+def _name(content_hash, size, owner_id=None):
+    name = f"{THUMBNAIL_DIR}/{size}/{content_hash[:2]}/{content_hash}.webp"
+    return f"images/{owner_id}/{name}" if owner_id is not None else name
+
+
+def _upload_hashes(Image):
+    """Yield ``(user_id, content_hash)`` for every upload with thumbnails, in pk batches."""
+    last_pk = 0
+    while True:
+        batch = list(
+            Image.objects.filter(pk__gt=last_pk).exclude(content_hash="")
+            .order_by("pk").values_list("pk", "user_id", "content_hash")[:BATCH_SIZE]
+        )
+        if not batch:
+            return
+        for _, user_id, content_hash in batch:
+            yield user_id, content_hash
+        last_pk = batch[-1][0]
+
+
+def move_upload_thumbnails(apps, schema_editor):
+    """Copy upload thumbnails into their owner's folder and drop the public copies."""
+    Image = apps.get_model("api", "Image")
+    DatasetImage = apps.get_model("api", "DatasetImage")
+    shared = set(DatasetImage.objects.exclude(content_hash="").values_list("content_hash", flat=True))
+
+    public = set()
+    for user_id, content_hash in _upload_hashes(Image):
+        for size in settings.THUMBNAIL_SIZES:
+            source = os.path.join(settings.MEDIA_ROOT, _name(content_hash, size))
+            target = os.path.join(settings.MEDIA_ROOT, _name(content_hash, size, user_id))
+            if os.path.exists(source) and not os.path.exists(target):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copyfile(source, target)
+            if content_hash not in shared:
+                public.add(source)
+
+    for path in public:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_vector_versions'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_upload_thumbnails, migrations.RunPython.noop),
+    ]
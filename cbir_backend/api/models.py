@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 import os
 
 
@@ -13,21 +14,31 @@ class Image(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to=upload_to)
     filename = models.CharField(max_length=255)
-    feature_vector = models.JSONField(null=True, blank=True, help_text="Stores CLIP feature vector")
+    feature_vector = models.BinaryField(null=True, blank=True, help_text="Stores CLIP feature vector as binary float32/float16 data")
+    content_hash = models.CharField(max_length=64, blank=True, default='', help_text="SHA-256 of the image bytes; set once its thumbnails exist")
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         db_table = 'images'
         ordering = ['-uploaded_at']
+        indexes = [
+            # Keyset pagination of the image list, for admins and per owner
+            models.Index(fields=['-uploaded_at', '-id'], name='image_recent_idx'),
+            models.Index(fields=['user', '-uploaded_at', '-id'], name='image_user_recent_idx'),
+        ]
 
     def __str__(self):
         return f"{self.filename} ({self.user.username})"
 
     def delete(self, *args, **kwargs):
         """Delete image file when model is deleted."""
+        from .thumbnails import delete_thumbnails
+
         if self.image and os.path.isfile(self.image.path):
             os.remove(self.image.path)
-        super().delete(*args, **kwargs)
+        result = super().delete(*args, **kwargs)
+        delete_thumbnails(self.content_hash, self.user_id)
+        return result
 
 
 class SearchHistory(models.Model):
@@ -35,7 +46,8 @@ class SearchHistory(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='searches')
     query_image = models.ForeignKey(Image, on_delete=models.SET_NULL, null=True, related_name='query_searches')
     results_count = models.IntegerField(default=0)
-    searched_at = models.DateTimeField(auto_now_add=True)
+    # Set when the search ran, not when the buffered row is written (see api.history)
+    searched_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         db_table = 'search_history'
@@ -46,7 +58,97 @@ class DatasetImage(models.Model):
     """Stores dataset images used for similarity search."""
     image = models.ImageField(upload_to='images/')
     filename = models.CharField(max_length=255, unique=True)
-    feature_vector = models.JSONField(null=True, blank=True, help_text="Stores CLIP feature vector")
+    feature_vector = models.BinaryField(null=True, blank=True, help_text="Stores CLIP feature vector as binary float32/float16 data")
+    content_hash = models.CharField(max_length=64, blank=True, default='', help_text="SHA-256 of the image bytes; set once its thumbnails exist")
 
     def __str__(self):
         return self.filename
+
+
+class VectorVersion(models.Model):
+    """Write counter of one vector table, bumped whenever its stored vectors change.
+
+    Search processes compare it with the value their in-memory indexes were
+    built from, so changes made by other processes (ingest worker, dataset
+    indexing) are noticed even when row counts and ids happen to match.
+    """
+    name = models.CharField(max_length=16, unique=True)
+    version = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'vector_versions'
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+
+class DailyStat(models.Model):
+    """Per-day activity counters behind the admin stats endpoint.
+
+    Uploads and signups are counted on the day the row was created and
+    taken back when it is deleted, so sums over this table match counts
+    over the source tables.
+    """
+    date = models.DateField(unique=True)
+    uploads = models.IntegerField(default=0)
+    searches = models.IntegerField(default=0)
+    signups = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'daily_stats'
+        ordering = ['-date']
+
+    def __str__(self):
+        return f"{self.date}: {self.uploads} uploads, {self.searches} searches, {self.signups} signups"
+
+
+class EmbeddingCache(models.Model):
+    """CLIP embedding of an image's exact bytes, reused by every ingestion path."""
+    content_hash = models.CharField(max_length=64, help_text="SHA-256 of the image bytes")
+    model_id = models.CharField(max_length=64)
+    feature_vector = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'embedding_cache'
+        constraints = [
+            models.UniqueConstraint(fields=['content_hash', 'model_id'], name='unique_embedding_per_model'),
+        ]
+
+    def __str__(self):
+        return f"{self.content_hash[:12]} ({self.model_id})"
+
+
+class IngestJob(models.Model):
+    """Queued feature extraction for an uploaded image."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    # Lower values are claimed first
+    PRIORITY_INTERACTIVE = 0
+    PRIORITY_BACKFILL = 10
+
+    image = models.ForeignKey(Image, on_delete=models.CASCADE, related_name='ingest_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    priority = models.SmallIntegerField(default=PRIORITY_INTERACTIVE)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    available_at = models.DateTimeField(default=timezone.now, help_text="Earliest time the job may be claimed")
+    locked_by = models.CharField(max_length=64, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'ingest_jobs'
+        ordering = ['priority', 'created_at']
+        indexes = [
+            models.Index(fields=['status', 'priority', 'available_at'], name='ingest_job_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job {self.id} for image {self.image_id} ({self.status})"
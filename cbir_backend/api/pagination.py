@@ -0,0 +1,17 @@
+"""Pagination classes for the image API."""
+
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class ImageCursorPagination(CursorPagination):
+    """Keyset pages over (-uploaded_at, -id).
+
+    Each page is an indexed range scan from the cursor position, so page
+    cost does not grow with the offset the way ``LIMIT/OFFSET`` does.
+    ``id`` breaks ties between images uploaded in the same instant.
+    """
+    ordering = ('-uploaded_at', '-id')
+    page_size = settings.IMAGE_LIST_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.IMAGE_LIST_MAX_PAGE_SIZE
@@ -0,0 +1,54 @@
+"""Search result cache keyed by query image content.
+
+Entries live in the Django cache named by ``SEARCH_CACHE_ALIAS`` so that a
+shared backend (Redis, Memcached, database) lets every worker reuse them.
+Each key embeds the fingerprint of the index partitions that computed the
+results (``search_engine.index_fingerprint``). Partitions pick up writes
+from any process through the database version counters, so once they
+have, older entries are unreachable and the backend's own LRU/TTL policy
+reclaims them.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import metrics
+
+def _cache():
+    return caches[getattr(settings, "SEARCH_CACHE_ALIAS", "default")]
+
+
+def hash_file(image_file) -> str:
+    """Return the SHA-256 hex digest of an uploaded file and rewind it."""
+    digest = hashlib.sha256()
+    image_file.seek(0)
+    for chunk in image_file.chunks():
+        digest.update(chunk)
+    image_file.seek(0)
+    return digest.hexdigest()
+
+
+def visibility_scope(user) -> str:
+    """Identify the set of images ``user`` is allowed to see."""
+    if user is None or user.is_admin():
+        return "all"
+    return f"user:{user.id}"
+
+
+def make_key(content_hash: str, top_k: int, scope: str, host: str = "", index: str = "") -> str:
+    """Build the cache key for one search against the partitions fingerprinted by ``index``."""
+    return f"search:{index}:{scope}:{host}:{top_k}:{content_hash}"
+
+
+def get_results(key: str):
+    """Return cached results for ``key`` or ``None``."""
+    results = _cache().get(key)
+    metrics.SEARCH_CACHE.inc(result="miss" if results is None else "hit")
+    return results
+
+
+def set_results(key: str, results) -> None:
+    """Store search results under ``key`` with the backend's default TTL."""
+    _cache().set(key, results)
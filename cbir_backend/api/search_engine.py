@@ -1,95 +1,785 @@
+import heapq
+import itertools
 import logging
-from typing import List, Tuple
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, List, Optional, Tuple
 
-import faiss
 import numpy as np
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 
-from .clip_utils import json_to_features
+from . import metrics
+from .clip_utils import bytes_to_features
+
+if TYPE_CHECKING:  # faiss is imported lazily inside the functions that need it
+    import faiss
 
 logger = logging.getLogger(__name__)
 
-_faiss_index = None
+_faiss_build_report: dict = {}
 
+DEFAULT_VECTOR_INDEX = {
+    "TYPE": "flat",
+    "NLIST": 1024,
+    "NPROBE": 16,
+    "HNSW_M": 32,
+    "EF_CONSTRUCTION": 80,
+    "EF_SEARCH": 64,
+    "TRAIN_SAMPLE": 100_000,
+    "PQ_M": 64,
+    "PQ_NBITS": 8,
+    "RERANK_FACTOR": 4,
+    "RECALL_REPORT": False,
+    "RECALL_QUERIES": 200,
+    "FLAT_BELOW": 10_000,
+    "INCREMENTAL_MAX": 10_000,
+    "REBUILD_FRACTION": 0.2,
+    "PARTITION_BUDGET_MB": 512,
+}
 
-def initialize_faiss_index(dimension: int = 512):
-    """Initialise a CPU-based FAISS index."""
-    global _faiss_index
+# Index types whose stored codes are lossy and benefit from an exact rerank
+COMPRESSED_INDEX_TYPES = {"sq8", "pq", "fp16"}
 
-    if _faiss_index is not None:
-        return _faiss_index
+SOURCE_UPLOAD = 0
+SOURCE_DATASET = 1
 
-    _faiss_index = faiss.IndexFlatL2(dimension)
-    logger.info("FAISS index initialised on CPU")
-    return _faiss_index
+# ``VectorVersion`` row of each vector table
+VERSION_NAMES = {SOURCE_UPLOAD: "uploads", SOURCE_DATASET: "dataset"}
 
+# Partition keys: every upload, one user's uploads, or the shared dataset
+PARTITION_UPLOADS = ("uploads",)
+PARTITION_DATASET = ("dataset",)
 
-def rebuild_faiss_index() -> Tuple[faiss.Index, List[int]]:
-    """Rebuild FAISS index from all stored image features."""
-    from .models import Image
+_partitions: "OrderedDict[tuple, IndexPartition]" = OrderedDict()
+_partitions_lock = threading.RLock()
+# Keys being built for the first time, and keys rebuilding in the background
+_build_locks: dict = {}
+_rebuilding: set = set()
 
-    index = initialize_faiss_index()
-    index.reset()
+# Keeps IN (...) lookups below SQLite's bound-parameter limit
+LOOKUP_CHUNK_SIZE = 500
 
-    images = Image.objects.all()
-    if not images.exists():
-        return index, []
 
-    vectors: List[np.ndarray] = []
-    image_ids: List[int] = []
+def _vector_tables():
+    from .models import DatasetImage, Image
+
+    return ((SOURCE_UPLOAD, Image), (SOURCE_DATASET, DatasetImage))
+
+
+def _source_of(model) -> int:
+    return SOURCE_DATASET if model._meta.model_name == "datasetimage" else SOURCE_UPLOAD
+
+
+def vector_version(source: int) -> int:
+    """Current write counter of one vector table."""
+    from .models import VectorVersion
+
+    version = VectorVersion.objects.filter(name=VERSION_NAMES[source]).values_list("version", flat=True).first()
+    return version or 0
+
+
+def bump_vector_version(source: int) -> None:
+    """Record that stored vectors of one table changed.
+
+    Model saves and deletes bump it through signals; bulk writers
+    (``bulk_update``/``bulk_create``) must call this themselves.
+    """
+    from django.db.models import F
+
+    from .models import VectorVersion
+
+    name = VERSION_NAMES[source]
+    VectorVersion.objects.get_or_create(name=name)
+    VectorVersion.objects.filter(name=name).update(version=F("version") + 1)
+
+
+def _queryset_fingerprint(queryset, source: int) -> tuple:
+    """Change detector for the stored vectors of a queryset.
+
+    The table's version counter catches every change made through the
+    models or a bulk writer that bumps it, including ones that leave count
+    and max id as they were (a delete plus a filled-in pending row).
+    Count and max id still catch bulk inserts that bypass both. The version
+    is read first, so a write racing with the load shows up as a new
+    fingerprint on the next check.
+    """
+    from django.db.models import Count, Max
+
+    version = vector_version(source)
+    stats = queryset.filter(feature_vector__isnull=False).aggregate(count=Count("id"), last=Max("id"))
+    return version, stats["count"], stats["last"]
+
+
+# ---------------------------------------------------------------------
+# Signal receivers
+# ---------------------------------------------------------------------
+
+def _vector_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw and (update_fields is None or "feature_vector" in update_fields):
+        bump_vector_version(_source_of(sender))
+
+
+def _vector_deleted(sender, instance, **kwargs):
+    bump_vector_version(_source_of(sender))
+
+
+def connect_signals() -> None:
+    from django.db.models.signals import post_delete, post_save
+
+    for model in ("api.Image", "api.DatasetImage"):
+        post_save.connect(_vector_saved, sender=model, dispatch_uid=f"vectors_saved_{model}")
+        post_delete.connect(_vector_deleted, sender=model, dispatch_uid=f"vectors_deleted_{model}")
+
+
+def get_index_config() -> dict:
+    """Return the ``VECTOR_INDEX`` settings merged over the defaults."""
+    config = dict(DEFAULT_VECTOR_INDEX)
+    config.update(getattr(settings, "VECTOR_INDEX", {}))
+    config["TYPE"] = str(config["TYPE"]).lower()
+    return config
+
+
+def create_index(dimension: int, num_vectors: int = 0, config: Optional[dict] = None) -> "faiss.Index":
+    """Create an empty FAISS index of the configured type.
+
+    ``num_vectors`` caps the IVF list count so that every list gets enough
+    training points (FAISS wants roughly 39 per centroid).
+    """
+    import faiss
+
+    config = config or get_index_config()
+    index_type = config["TYPE"]
+
+    if index_type == "flat":
+        return faiss.IndexFlatL2(dimension)
+
+    if index_type == "ivf":
+        nlist = int(config["NLIST"])
+        if num_vectors:
+            nlist = max(1, min(nlist, num_vectors // 39))
+        quantizer = faiss.IndexFlatL2(dimension)
+        index = faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss.METRIC_L2)
+        index.nprobe = min(int(config["NPROBE"]), nlist)
+        return index
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, int(config["HNSW_M"]))
+        index.hnsw.efConstruction = int(config["EF_CONSTRUCTION"])
+        index.hnsw.efSearch = int(config["EF_SEARCH"])
+        return index
+
+    if index_type in ("sq8", "fp16"):
+        qtype = faiss.ScalarQuantizer.QT_8bit if index_type == "sq8" else faiss.ScalarQuantizer.QT_fp16
+        return faiss.IndexScalarQuantizer(dimension, qtype, faiss.METRIC_L2)
+
+    if index_type == "pq":
+        pq_m = int(config["PQ_M"])
+        if dimension % pq_m:
+            raise ImproperlyConfigured(f"VECTOR_INDEX PQ_M={pq_m} must divide the dimension {dimension}")
+        return faiss.IndexPQ(dimension, pq_m, int(config["PQ_NBITS"]), faiss.METRIC_L2)
+
+    raise ImproperlyConfigured(f"Unknown VECTOR_INDEX TYPE: {config['TYPE']!r}")
 
-    for img in images:
-        try:
-            features = json_to_features(img.feature_vector)
-            vectors.append(features)
-            image_ids.append(img.id)
-        except Exception as exc:  # pylint: disable=broad-except
-            logger.warning("Skipping image %s due to feature decode error: %s", img.id, exc)
-            continue
 
-    if vectors:
-        vectors_array = np.stack(vectors).astype("float32")
-        index.add(vectors_array)
-        logger.info("FAISS index rebuilt with %d vectors", len(vectors))
+def _training_sample(vectors: np.ndarray, size: int) -> np.ndarray:
+    """Return a reproducible random sample of at most ``size`` rows."""
+    if vectors.shape[0] <= size:
+        return vectors
+    rows = np.random.default_rng(0).choice(vectors.shape[0], size=size, replace=False)
+    return vectors[np.sort(rows)]
+
+
+def build_index(vectors: np.ndarray, config: Optional[dict] = None, ids: Optional[np.ndarray] = None) -> "faiss.Index":
+    """Create, train (if required) and fill an index with ``vectors``.
+
+    With ``ids`` the entries are stored under those ids (see ``with_ids``),
+    so they can later be added and removed one by one. The memory the index
+    takes is always logged; its recall only with ``RECALL_REPORT`` on.
+    """
+    global _faiss_build_report
+    config = config or get_index_config()
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    index = create_index(vectors.shape[1], vectors.shape[0], config)
+
+    if not index.is_trained:
+        started = time.perf_counter()
+        index.train(_training_sample(vectors, int(config["TRAIN_SAMPLE"])))
+        logger.info("Trained %s index in %.2fs", config["TYPE"], time.perf_counter() - started)
+
+    if ids is None:
+        index.add(vectors)
     else:
-        logger.info("FAISS index reset with no vectors")
+        ids = np.asarray(ids, dtype=np.int64)
+        index = with_ids(index)
+        index.add_with_ids(vectors, ids)
 
-    return index, image_ids
+    if config["TYPE"] != "flat" and config["RECALL_REPORT"]:
+        report = describe_index(index, vectors, config, ids=ids)
+        recall = f", recall@{report['recall_k']}={report['recall']:.3f}"
+    else:
+        report, recall = _size_report(index, config), ""
+    _faiss_build_report = report
+    logger.info(
+        "%s index: %d vectors, %d bytes/vector, %.1f MiB%s",
+        report["type"], report["ntotal"], report["bytes_per_vector"], report["nbytes"] / (1024 * 1024), recall,
+    )
+    return index
 
 
-def search_similar_images(query_features: np.ndarray, top_k: int = 10, user=None):
-    """Return the top-k most similar images for the given feature vector."""
-    from .models import Image
+def with_ids(index: "faiss.Index") -> "faiss.Index":
+    """Make ``index`` addressable by record id (``add_with_ids``/``remove_ids``).
 
-    index, image_ids = rebuild_faiss_index()
-    if index.ntotal == 0:
-        return []
+    IVF indexes store ids natively; the others are wrapped in ``IndexIDMap``.
+    """
+    import faiss
 
-    query_features = query_features.reshape(1, -1).astype("float32")
-    distances, indices = index.search(query_features, min(top_k * 2, index.ntotal))
+    if isinstance(index, faiss.IndexIVF):
+        return index
+    return faiss.IndexIDMap(index)
 
-    results = []
-    for dist, idx in zip(distances[0], indices[0]):
-        if idx >= len(image_ids):
+
+def _base_index(index: "faiss.Index") -> "faiss.Index":
+    """The index under an ``IndexIDMap`` wrapper (or ``index`` itself)."""
+    import faiss
+
+    if isinstance(index, faiss.IndexIDMap):
+        return faiss.downcast_index(index.index)
+    return index
+
+
+def _size_report(index: "faiss.Index", config: dict) -> dict:
+    return {
+        "type": config["TYPE"],
+        "ntotal": int(index.ntotal),
+        "bytes_per_vector": _code_size(index),
+        "nbytes": _index_nbytes(index),
+    }
+
+
+def describe_index(index: "faiss.Index", vectors: np.ndarray, config: Optional[dict] = None, k: int = 10,
+                   ids: Optional[np.ndarray] = None) -> dict:
+    """Measure memory per vector and recall@k of ``index`` against exact search.
+
+    Queries are slightly perturbed copies of at most ``RECALL_QUERIES``
+    stored vectors, so a query is not trivially answered by its own entry,
+    and their exact neighbours come from ``faiss.knn``, which scans
+    ``vectors`` in blocks. ``ids`` are the labels the index stores for
+    ``vectors`` (their row numbers by default). Costs about one exact search
+    per query; ``build_index`` only runs it with ``RECALL_REPORT`` on.
+    """
+    import faiss
+
+    config = config or get_index_config()
+    total = int(index.ntotal)
+    k = min(k, total)
+
+    sample = _training_sample(vectors, int(config["RECALL_QUERIES"]))
+    noise = np.random.default_rng(1).normal(scale=0.05, size=sample.shape).astype(np.float32)
+    queries = sample + noise
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    _, exact = faiss.knn(np.ascontiguousarray(queries), np.ascontiguousarray(vectors, dtype=np.float32), k)
+    if ids is not None:
+        exact = np.asarray(ids)[exact]
+    _, approx = search_index(index, queries, k)
+    hits = sum(len(set(a) & set(e)) for a, e in zip(approx.tolist(), exact.tolist()))
+
+    report = _size_report(index, config)
+    report.update(recall_k=k, recall=hits / float(k * queries.shape[0]))
+    return report
+
+
+def get_index_report() -> dict:
+    """Return the memory (and, with ``RECALL_REPORT``, recall) report of the last built index."""
+    return dict(_faiss_build_report)
+
+
+def _search_params(index: "faiss.Index", nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+    """Per-query search parameters, leaving the shared index untouched."""
+    import faiss
+
+    index = _base_index(index)
+    if nprobe is not None and isinstance(index, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(nprobe=int(nprobe))
+    if ef_search is not None and isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(efSearch=int(ef_search))
+    return None
+
+
+def search_index(index: "faiss.Index", queries: np.ndarray, k: int,
+                 nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+    """Search ``index`` with optional per-query ``nprobe``/``efSearch`` overrides."""
+    queries = np.ascontiguousarray(np.atleast_2d(queries), dtype=np.float32)
+    params = _search_params(index, nprobe, ef_search)
+    if params is None:
+        return index.search(queries, k)
+    return index.search(queries, k, params=params)
+
+
+def rerank_exact(query: np.ndarray, candidate_ids: List[int], vectors_by_id: dict) -> List[Tuple[int, float]]:
+    """Re-score candidates with their full-precision vectors (squared L2), best first."""
+    query = np.asarray(query, dtype=np.float32).ravel()
+    scored = []
+    for image_id in candidate_ids:
+        vector = vectors_by_id.get(image_id)
+        if vector is None:
             continue
-        image_id = image_ids[idx]
+        diff = vector.astype(np.float32) - query
+        scored.append((image_id, float(diff @ diff)))
+    scored.sort(key=lambda item: item[1])
+    return scored
+
+
+def _code_size(index: "faiss.Index") -> int:
+    """Bytes stored per vector: its code, its id and, for HNSW, its level-0 links."""
+    import faiss
+
+    base = _base_index(index)
+    id_size = 8 if base is not index or isinstance(base, faiss.IndexIVF) else 0
+    if isinstance(base, faiss.IndexHNSW):
+        return faiss.downcast_index(base.storage).sa_code_size() + base.hnsw.nb_neighbors(0) * 4 + id_size
+    if isinstance(base, faiss.IndexIVF):
+        return base.code_size + id_size
+    try:
+        return base.sa_code_size() + id_size
+    except RuntimeError:
+        return base.d * 4 + id_size
+
+
+def _index_nbytes(index: "faiss.Index") -> int:
+    """Approximate resident size of an index's stored codes."""
+    return int(index.ntotal) * _code_size(index)
+
+
+def _load_vectors(queryset, dimension: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Decode and L2-normalise the stored vectors of ``queryset``; return ``(ids, vectors)``.
+
+    Vectors that fail to decode, have another dimension than ``dimension``
+    (the first one read by default) or are all zeros are skipped.
+    """
+    vectors: List[np.ndarray] = []
+    record_ids: List[int] = []
+
+    rows = queryset.filter(feature_vector__isnull=False).values_list("id", "feature_vector")
+    for record_id, blob in rows.iterator(chunk_size=2000):
         try:
-            image = Image.objects.get(id=image_id)
-        except Image.DoesNotExist:
+            vector = bytes_to_features(blob)
+        except (TypeError, ValueError, struct.error) as exc:
+            logger.warning("Skipping %s %s due to feature decode error: %s", queryset.model.__name__, record_id, exc)
+            continue
+        if dimension is None:
+            dimension = vector.shape[0]
+        if vector.shape[0] != dimension:
+            logger.warning("Skipping %s %s with dimension %d", queryset.model.__name__, record_id, vector.shape[0])
+            continue
+        vectors.append(vector)
+        record_ids.append(record_id)
+
+    if not vectors:
+        return np.empty(0, dtype=np.int64), np.empty((0, dimension or 512), dtype=np.float32)
+
+    matrix = np.stack(vectors).astype(np.float32)
+    norms = np.linalg.norm(matrix, axis=1)
+    valid = norms > 0
+    return np.asarray(record_ids, dtype=np.int64)[valid], matrix[valid] / norms[valid, None]
+
+
+def _partition_index_type(size: int, config: dict) -> str:
+    """Partitions smaller than ``FLAT_BELOW`` always use an exact flat index."""
+    return "flat" if size < int(config["FLAT_BELOW"]) else config["TYPE"]
+
+
+class IndexPartition:
+    """FAISS index over the vectors visible to one search scope.
+
+    Vectors are L2-normalised and stored under their record ids (see
+    ``with_ids``), so a refresh adds new rows and removes deleted ones in
+    place instead of rebuilding. HNSW graphs cannot drop entries; their
+    deleted ids are filtered out of results until the next rebuild.
+    """
+
+    def __init__(self, key: tuple, index: "faiss.Index", ids: np.ndarray, index_type: str, fingerprint=None):
+        self.key = key
+        self.index = index
+        self.ids = np.sort(np.asarray(ids, dtype=np.int64))
+        self.index_type = index_type
+        self.fingerprint = fingerprint
+        self.checked_at = time.monotonic()
+        # Additions and removals since the build, and ids HNSW still holds
+        self.built_size = len(self.ids)
+        self.changes = 0
+        self.tombstones: set = set()
+        # ``lock`` guards the index; ``refresh_lock`` lets one thread diff at a time
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        return _index_nbytes(self.index) + self.ids.nbytes
+
+    @property
+    def source(self) -> int:
+        return _partition_source(self.key)
+
+    @property
+    def model(self):
+        return dict(_vector_tables())[self.source]
+
+    def search(self, queries: np.ndarray, k: int, nprobe: Optional[int] = None,
+               ef_search: Optional[int] = None, rerank: Optional[int] = None) -> List[List[Tuple[float, int]]]:
+        """Return, per query, up to ``k`` ``(distance, record_id)`` pairs, nearest first.
+
+        ``queries`` must be L2-normalised; distances are squared L2.
+        """
+        queries = np.ascontiguousarray(np.atleast_2d(queries), dtype=np.float32)
+        if rerank is None:
+            rerank = int(get_index_config()["RERANK_FACTOR"])
+        if self.index_type not in COMPRESSED_INDEX_TYPES:
+            rerank = 0
+
+        with self.lock:
+            total = int(self.index.ntotal)
+            if total == 0 or k <= 0:
+                return [[] for _ in range(queries.shape[0])]
+            tombstones = set(self.tombstones)
+            fetch_k = min(k * max(rerank, 1) + len(tombstones), total)
+            distances, labels = search_index(self.index, queries, fetch_k, nprobe, ef_search)
+
+        per_query = [
+            [(float(dist), int(label)) for dist, label in zip(row_distances, row_labels)
+             if label >= 0 and label not in tombstones]
+            for row_distances, row_labels in zip(distances, labels)
+        ]
+        if rerank:
+            vectors_by_id = self._stored_vectors({record_id for hits in per_query for _, record_id in hits})
+            per_query = [
+                [(dist, record_id) for record_id, dist in
+                 rerank_exact(query, [record_id for _, record_id in hits], vectors_by_id)]
+                for query, hits in zip(queries, per_query)
+            ]
+        return [hits[:k] for hits in per_query]
+
+    def _stored_vectors(self, record_ids) -> dict:
+        """Full-precision normalised vectors of ``record_ids`` for the exact rerank."""
+        record_ids = list(record_ids)
+        vectors_by_id = {}
+        for start in range(0, len(record_ids), LOOKUP_CHUNK_SIZE):
+            ids, vectors = _load_vectors(self.model.objects.filter(id__in=record_ids[start:start + LOOKUP_CHUNK_SIZE]),
+                                         self.index.d)
+            vectors_by_id.update(zip(ids.tolist(), vectors))
+        return vectors_by_id
+
+    def apply(self, added_ids: np.ndarray, vectors: np.ndarray, removed_ids: np.ndarray, fingerprint) -> None:
+        """Add and remove entries in place and adopt the new fingerprint."""
+        with self.lock:
+            if len(removed_ids):
+                if self.index_type == "hnsw":
+                    self.tombstones.update(removed_ids.tolist())
+                else:
+                    self.index.remove_ids(np.ascontiguousarray(removed_ids, dtype=np.int64))
+            if len(added_ids):
+                self.index.add_with_ids(np.ascontiguousarray(vectors, dtype=np.float32),
+                                        np.ascontiguousarray(added_ids, dtype=np.int64))
+            self.ids = np.union1d(np.setdiff1d(self.ids, removed_ids, assume_unique=True), added_ids)
+            self.changes += len(added_ids) + len(removed_ids)
+            self.fingerprint = fingerprint
+
+    def needs_rebuild(self, config: dict) -> bool:
+        """Whether a full rebuild would serve better than further in-place updates.
+
+        True once the partition crossed ``FLAT_BELOW`` either way, or once a
+        trained index saw more changes than ``REBUILD_FRACTION`` of the
+        vectors it was trained on (its centroids, codebooks or graph drift).
+        """
+        if _partition_index_type(len(self.ids), config) != self.index_type:
+            return True
+        if self.index_type == "flat":
+            return False
+        return self.changes > float(config["REBUILD_FRACTION"]) * max(self.built_size, 1)
+
+
+def _partition_source(key: tuple) -> int:
+    return SOURCE_DATASET if key == PARTITION_DATASET else SOURCE_UPLOAD
+
+
+def _partition_queryset(key: tuple):
+    from .models import DatasetImage, Image
+
+    if key == PARTITION_DATASET:
+        return DatasetImage.objects.all()
+    if key == PARTITION_UPLOADS:
+        return Image.objects.all()
+    return Image.objects.filter(user_id=key[1])
+
+
+def partition_key_for(user) -> tuple:
+    """Partition of uploaded images that ``user`` may see (all of them for admins)."""
+    if user is None or user.is_admin():
+        return PARTITION_UPLOADS
+    return ("user", user.id)
+
+
+def build_partition(key: tuple) -> IndexPartition:
+    """Load the vectors of one partition and index them."""
+    queryset = _partition_queryset(key)
+    fingerprint = _queryset_fingerprint(queryset, _partition_source(key))
+
+    with metrics.span("index_load"):
+        record_ids, vectors = _load_vectors(queryset)
+
+    config = get_index_config()
+    config["TYPE"] = _partition_index_type(len(record_ids), config)
+
+    with metrics.span("index_build"):
+        if len(record_ids):
+            index = build_index(vectors, config, ids=record_ids)
+            logger.info("FAISS partition %s built with %d vectors", key, len(record_ids))
+        else:
+            index = with_ids(create_index(vectors.shape[1], config=config))
+
+    return IndexPartition(key, index, record_ids, config["TYPE"], fingerprint)
+
+
+def _refresh_partition(partition: IndexPartition) -> None:
+    """Bring a partition up to date with the database.
+
+    New and deleted rows are found by diffing record ids and applied in
+    place. Changes too large to load on the request path
+    (``INCREMENTAL_MAX``), or that leave the index in need of retraining,
+    go to a background rebuild while the current index keeps serving.
+    """
+    if not partition.refresh_lock.acquire(blocking=False):
+        return  # another thread is already on it
+    try:
+        queryset = _partition_queryset(partition.key)
+        fingerprint = _queryset_fingerprint(queryset, partition.source)
+        if fingerprint == partition.fingerprint:
+            return
+
+        current = np.fromiter(
+            queryset.filter(feature_vector__isnull=False).values_list("id", flat=True).iterator(chunk_size=10_000),
+            dtype=np.int64,
+        )
+        added = np.setdiff1d(current, partition.ids)
+        removed = np.setdiff1d(partition.ids, current)
+
+        config = get_index_config()
+        if len(added) > int(config["INCREMENTAL_MAX"]):
+            schedule_rebuild(partition.key)
+            return
+
+        loaded_ids, loaded = [], []
+        for start in range(0, len(added), LOOKUP_CHUNK_SIZE):
+            ids, vectors = _load_vectors(queryset.filter(id__in=added[start:start + LOOKUP_CHUNK_SIZE].tolist()),
+                                         partition.index.d)
+            loaded_ids.append(ids)
+            loaded.append(vectors)
+        added_ids = np.concatenate(loaded_ids) if loaded_ids else np.empty(0, dtype=np.int64)
+        vectors = np.concatenate(loaded) if loaded else np.empty((0, partition.index.d), dtype=np.float32)
+
+        partition.apply(added_ids, vectors, removed, fingerprint)
+        logger.info("FAISS partition %s: +%d/-%d vectors in place", partition.key, len(added_ids), len(removed))
+        if partition.needs_rebuild(config):
+            schedule_rebuild(partition.key)
+    finally:
+        partition.refresh_lock.release()
+
+
+def _evict_partitions(keep: tuple) -> None:
+    """Drop least recently used partitions until the memory budget is met."""
+    budget = int(get_index_config()["PARTITION_BUDGET_MB"]) * 1024 * 1024
+    total = sum(partition.nbytes for partition in _partitions.values())
+    for key in list(_partitions):
+        if total <= budget:
+            break
+        if key in (keep, PARTITION_DATASET):
             continue
+        total -= _partitions.pop(key).nbytes
+        logger.info("Evicted FAISS partition %s", key)
+
+
+def _install_partition(partition: IndexPartition) -> None:
+    with _partitions_lock:
+        _partitions[partition.key] = partition
+        _partitions.move_to_end(partition.key)
+        _evict_partitions(keep=partition.key)
+
+
+def get_partition(key: tuple) -> IndexPartition:
+    """Return the partition for ``key``, refreshing it when its check is due.
+
+    Staleness is checked at most every ``VECTOR_MATRIX_CHECK_INTERVAL``
+    seconds (see ``_refresh_partition``). Only a partition's first build
+    runs on the request path, and it only blocks searches of the same key.
+    """
+    interval = getattr(settings, "VECTOR_MATRIX_CHECK_INTERVAL", 5.0)
+    with _partitions_lock:
+        partition = _partitions.get(key)
+        if partition is not None:
+            _partitions.move_to_end(key)
+        else:
+            build_lock = _build_locks.setdefault(key, threading.Lock())
+
+    if partition is None:
+        with build_lock:
+            with _partitions_lock:
+                partition = _partitions.get(key)
+            if partition is None:
+                partition = build_partition(key)
+                _install_partition(partition)
+            with _partitions_lock:
+                _build_locks.pop(key, None)
+        return partition
+
+    now = time.monotonic()
+    if now - partition.checked_at >= interval:
+        partition.checked_at = now
+        _refresh_partition(partition)
+    return partition
+
+
+def _rebuild_partition(key: tuple) -> None:
+    from django.db import connection
+
+    try:
+        with metrics.span("index_rebuild"):
+            partition = build_partition(key)
+        # Changes made while it was building are applied on the next search
+        partition.checked_at = 0.0
+        with _partitions_lock:
+            if key in _partitions:  # not evicted or invalidated meanwhile
+                _install_partition(partition)
+    except Exception:  # pylint: disable=broad-except
+        logger.exception("Background rebuild of FAISS partition %s failed", key)
+    finally:
+        with _partitions_lock:
+            _rebuilding.discard(key)
+        connection.close()
+
+
+def schedule_rebuild(key: tuple) -> None:
+    """Rebuild a partition on a background thread and swap it in when done."""
+    with _partitions_lock:
+        if key in _rebuilding:
+            return
+        _rebuilding.add(key)
+    threading.Thread(target=_rebuild_partition, args=(key,), name=f"faiss-rebuild-{key[0]}", daemon=True).start()
+
+
+def invalidate_partitions(owner_id: Optional[int] = None) -> None:
+    """Make partitions holding ``owner_id``'s uploads (all if ``None``) recheck on their next search."""
+    with _partitions_lock:
+        for key, partition in _partitions.items():
+            if owner_id is None or key in (("user", owner_id), PARTITION_UPLOADS):
+                partition.checked_at = 0.0
+
+
+def rebuild_faiss_index() -> Tuple["faiss.Index", List[int]]:
+    """Rebuild FAISS index from all stored image features."""
+    with metrics.span("index_rebuild"):
+        partition = build_partition(PARTITION_UPLOADS)
+    _install_partition(partition)
+    return partition.index, partition.ids.tolist()
+
 
-        if user is not None and not user.is_admin() and image.user != user:
+def _search_keys(user, include_dataset: bool) -> List[tuple]:
+    keys = [partition_key_for(user)]
+    if include_dataset:
+        keys.append(PARTITION_DATASET)
+    return keys
+
+
+def index_fingerprint(user=None, include_dataset: bool = True) -> str:
+    """Identify the state of the partitions ``search_partitions`` would search.
+
+    It changes once those partitions apply a write from any process, so
+    results cached under it are never older than the partitions themselves.
+    """
+    return "/".join(
+        ".".join(str(part) for part in get_partition(key).fingerprint or ())
+        for key in _search_keys(user, include_dataset)
+    )
+
+
+def search_partitions(queries: np.ndarray, top_k: int = 10, user=None, include_dataset: bool = True,
+                      nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                      rerank: Optional[int] = None) -> List[List[Tuple[float, int, int]]]:
+    """Return, per query, up to ``top_k`` ``(score, source, record_id)`` hits, best first.
+
+    ``score`` is the cosine similarity. Only the partition of uploads
+    ``user`` may see is searched, merged with the shared dataset partition
+    unless ``include_dataset`` is false. ``nprobe`` (IVF) and ``ef_search``
+    (HNSW) override the configured search breadth for these queries only.
+    For compressed index types, ``rerank`` (default ``RERANK_FACTOR``, 0
+    disables) widens the candidate list by that factor and re-scores it with
+    the full-precision stored vectors.
+    """
+    queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+    queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+
+    streams: List[list] = [[] for _ in range(queries.shape[0])]
+    for key in _search_keys(user, include_dataset):
+        partition = get_partition(key)
+        for query_streams, hits in zip(streams, partition.search(queries, top_k, nprobe, ef_search, rerank)):
+            query_streams.append([(dist, partition.source, record_id) for dist, record_id in hits])
+
+    # Squared L2 between unit vectors is 2 - 2 * cosine
+    return [
+        [(1.0 - dist / 2.0, source, record_id)
+         for dist, source, record_id in itertools.islice(heapq.merge(*query_streams), top_k)]
+        for query_streams in streams
+    ]
+
+
+def search_similar_images(query_features: np.ndarray, top_k: int = 10, user=None,
+                          nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                          rerank: Optional[int] = None, include_dataset: bool = True):
+    """Return the top-k most similar images for the given feature vector.
+
+    Searches like ``search_partitions`` and loads the matching records.
+    """
+    hits = search_partitions(query_features, top_k, user, include_dataset, nprobe, ef_search, rerank)[0]
+
+    records = {}
+    for source, model in _vector_tables():
+        wanted = [record_id for _, hit_source, record_id in hits if hit_source == source]
+        records[source] = model.objects.in_bulk(wanted) if wanted else {}
+
+    results = []
+    for score, source, record_id in hits:
+        record = records[source].get(record_id)
+        if record is None:
             continue
 
-        similarity = max(0, 1 - dist) * 100
         results.append(
             {
-                "image_id": image_id,
-                "similarity": round(similarity, 2),
-                "distance": float(dist),
+                "image_id": record_id,
+                "source": "dataset" if source == SOURCE_DATASET else "upload",
+                "similarity": round(max(0.0, score) * 100, 2),
+                "distance": 2.0 - 2.0 * score,
+                "image": record,
             }
         )
 
-        if len(results) >= top_k:
-            break
-
     return results
+
+
+def _index_gauges() -> dict:
+    """Sizes of this process's resident indexes, without loading them."""
+    with _partitions_lock:
+        partitions = list(_partitions.values())
+    return {("partitions",): sum(len(partition.ids) for partition in partitions)}
+
+
+metrics.register_gauge("cbir_index_vectors", "Vectors held by the resident search indexes.", _index_gauges, ("index",))
+metrics.register_gauge(
+    "cbir_index_partitions", "FAISS partitions cached in this process.",
+    lambda: {(): len(_partitions)},
+)
+metrics.register_gauge(
+    "cbir_index_partition_bytes", "Memory used by cached FAISS partitions.",
+    lambda: {(): sum(partition.nbytes for partition in list(_partitions.values()))},
+)
@@ -1,30 +1,28 @@
 from rest_framework import serializers
-from .models import Image, SearchHistory
+from .media import media_url
+from .models import Image, IngestJob, SearchHistory
+from .thumbnails import thumbnail_urls
 
 
 class ImageSerializer(serializers.ModelSerializer):
     """Serializer for Image model."""
     user = serializers.StringRelatedField(read_only=True)
     image_url = serializers.SerializerMethodField()
+    thumbnails = serializers.SerializerMethodField()
     
     class Meta:
         model = Image
-        fields = ('id', 'user', 'image', 'image_url', 'filename', 'uploaded_at')
+        fields = ('id', 'user', 'image', 'image_url', 'thumbnails', 'filename', 'uploaded_at')
         read_only_fields = ('id', 'uploaded_at', 'user')
     
     def get_image_url(self, obj):
         request = self.context.get('request')
         if obj.image and hasattr(obj.image, 'url'):
-            return request.build_absolute_uri(obj.image.url) if request else obj.image.url
+            return media_url(obj.image.name, request)
         return None
 
-
-class SearchResultSerializer(serializers.Serializer):
-    """Serializer for search results."""
-    image_id = serializers.IntegerField()
-    similarity = serializers.FloatField()
-    distance = serializers.FloatField()
-    image = ImageSerializer(read_only=True)
+    def get_thumbnails(self, obj):
+        return thumbnail_urls(obj.content_hash, self.context.get('request'), obj.user_id)
 
 
 class SearchHistorySerializer(serializers.ModelSerializer):
@@ -34,3 +32,11 @@ class SearchHistorySerializer(serializers.ModelSerializer):
         fields = ('id', 'results_count', 'searched_at')
         read_only_fields = ('id', 'searched_at')
 
+
+
+class IngestJobSerializer(serializers.ModelSerializer):
+    """Serializer for queued upload ingestion jobs."""
+    class Meta:
+        model = IngestJob
+        fields = ('id', 'image', 'status', 'priority', 'attempts', 'error', 'created_at', 'updated_at')
+        read_only_fields = fields
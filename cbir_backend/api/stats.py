@@ -0,0 +1,140 @@
+"""Daily activity rollups for the admin stats endpoint.
+
+``DailyStat`` keeps one row of counters per day. Uploads and signups are
+maintained by model signals, searches by an explicit ``record`` call from
+the search views (their history rows are also written in bulk, which
+sends no signals). The dashboard then sums O(days) rows instead of
+counting the source tables, and ``manage.py rollup_stats`` rebuilds the
+counters from those tables to repair any drift.
+"""
+
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+COUNTERS = ("uploads", "searches", "signups")
+RECENT_DAYS = 7
+DASHBOARD_CACHE_KEY = "stats:dashboard"
+
+
+def record(counter: str, amount: int = 1, when=None) -> None:
+    """Add ``amount`` to one counter on the day of ``when``, a datetime or date (default: today)."""
+    from .models import DailyStat
+
+    if isinstance(when, datetime):
+        day = timezone.localdate(when)
+    else:
+        day = when or timezone.localdate()
+    DailyStat.objects.get_or_create(date=day)
+    DailyStat.objects.filter(date=day).update(**{counter: F(counter) + amount})
+
+
+# ---------------------------------------------------------------------
+# Signal receivers
+# ---------------------------------------------------------------------
+
+def _image_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        record("uploads", when=instance.uploaded_at)
+
+
+def _image_deleted(sender, instance, **kwargs):
+    record("uploads", -1, when=instance.uploaded_at)
+
+
+def _user_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        record("signups", when=instance.date_joined)
+
+
+def _user_deleted(sender, instance, **kwargs):
+    record("signups", -1, when=instance.date_joined)
+
+
+def connect_signals() -> None:
+    post_save.connect(_image_saved, sender="api.Image", dispatch_uid="stats_image_saved")
+    post_delete.connect(_image_deleted, sender="api.Image", dispatch_uid="stats_image_deleted")
+    post_save.connect(_user_saved, sender=settings.AUTH_USER_MODEL, dispatch_uid="stats_user_saved")
+    post_delete.connect(_user_deleted, sender=settings.AUTH_USER_MODEL, dispatch_uid="stats_user_deleted")
+
+
+# ---------------------------------------------------------------------
+# Rebuild and read
+# ---------------------------------------------------------------------
+
+def _counts_by_day(queryset, field: str, since: Optional[date]) -> dict:
+    if since:
+        # A range on the raw column, so its index can be used
+        queryset = queryset.filter(**{f"{field}__gte": timezone.make_aware(datetime.combine(since, time.min))})
+    rows = queryset.annotate(day=TruncDate(field)).values("day").annotate(n=Count("pk")).order_by()
+    return {row["day"]: row["n"] for row in rows}
+
+
+def rollup(days: Optional[int] = None) -> int:
+    """Recompute the counters from the source tables; return the rows written.
+
+    ``days`` limits the rebuild to that many most recent days.
+    """
+    from django.contrib.auth import get_user_model
+
+    from .models import DailyStat, Image, SearchHistory
+
+    since = timezone.localdate() - timedelta(days=days - 1) if days else None
+    counts = {
+        "uploads": _counts_by_day(Image.objects.all(), "uploaded_at", since),
+        "searches": _counts_by_day(SearchHistory.objects.all(), "searched_at", since),
+        "signups": _counts_by_day(get_user_model().objects.all(), "date_joined", since),
+    }
+    rows = {}
+    for counter, per_day in counts.items():
+        for day, n in per_day.items():
+            rows.setdefault(day, DailyStat(date=day))
+            setattr(rows[day], counter, n)
+
+    with transaction.atomic():
+        stale = DailyStat.objects.filter(date__gte=since) if since else DailyStat.objects.all()
+        stale.delete()
+        DailyStat.objects.bulk_create(rows.values(), batch_size=500)
+    _invalidate_dashboard()
+    return len(rows)
+
+
+def _cache():
+    from django.core.cache import caches
+
+    return caches[getattr(settings, "STATS_CACHE_ALIAS", "default")]
+
+
+def _invalidate_dashboard() -> None:
+    _cache().delete(DASHBOARD_CACHE_KEY)
+
+
+def _usage() -> dict:
+    from django.contrib.auth import get_user_model
+
+    from .models import DailyStat
+
+    totals = DailyStat.objects.aggregate(**{counter: Sum(counter) for counter in COUNTERS})
+    since = timezone.localdate() - timedelta(days=RECENT_DAYS - 1)
+    recent = DailyStat.objects.filter(date__gte=since).aggregate(**{counter: Sum(counter) for counter in COUNTERS})
+
+    # The users table stays small next to images and history; group it directly
+    by_role = get_user_model().objects.values("role").annotate(count=Count("id")).order_by()
+
+    return {
+        "users": {"total": totals["signups"] or 0, "by_role": list(by_role)},
+        "images": {"total": totals["uploads"] or 0, "recent_uploads": recent["uploads"] or 0},
+        "searches": {"total": totals["searches"] or 0, "recent": recent["searches"] or 0},
+    }
+
+
+def dashboard() -> dict:
+    """Usage figures for the admin dashboard, cached for ``STATS_CACHE_TTL`` seconds."""
+    ttl = getattr(settings, "STATS_CACHE_TTL", 30)
+    return _cache().get_or_set(DASHBOARD_CACHE_KEY, _usage, timeout=ttl)
@@ -0,0 +1,187 @@
+"""Fixed-size WebP thumbnails stored under content-hashed names.
+
+Every image gets one WebP per size in ``THUMBNAIL_SIZES`` at
+``MEDIA_ROOT/thumbs/<size>/<hash[:2]>/<hash>.webp``. Names derive from the
+SHA-256 of the original bytes, so identical images share derivatives and
+a thumbnail URL never changes content (safe to cache forever).
+
+Thumbnails of uploads are as private as the upload itself: they live under
+the owner's ``images/<user_id>/thumbs/`` folder, where ``api.media``
+applies the same access checks, and are removed with the upload. Only
+dataset thumbnails are shared and public.
+
+Uploads get their thumbnails when they are stored; existing rows are
+backfilled by ``manage.py generate_thumbnails`` with a process pool. A row's
+``content_hash`` is only set once its thumbnails exist, so serializers can
+advertise thumbnail URLs without touching the disk.
+"""
+
+import logging
+import multiprocessing
+import os
+import tempfile
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from .clip_utils import _open_image
+from .embedding_cache import hash_path
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_DIR = "thumbs"
+
+
+def thumbnail_sizes() -> Tuple[int, ...]:
+    return tuple(sorted(getattr(settings, "THUMBNAIL_SIZES", (128, 256, 512))))
+
+
+def thumbnail_name(content_hash: str, size: int, owner_id: Optional[int] = None) -> str:
+    """Storage name of one derivative, relative to ``MEDIA_ROOT``.
+
+    ``owner_id`` places an upload's thumbnails in its owner's private folder.
+    """
+    name = f"{THUMBNAIL_DIR}/{size}/{content_hash[:2]}/{content_hash}.webp"
+    return f"images/{owner_id}/{name}" if owner_id is not None else name
+
+
+def thumbnail_urls(content_hash: str, request=None, owner_id: Optional[int] = None) -> Optional[Dict[str, str]]:
+    """Map each size to its URL, or ``None`` if the image has no thumbnails yet."""
+    from .media import media_url
+
+    if not content_hash:
+        return None
+    return {str(size): media_url(thumbnail_name(content_hash, size, owner_id), request) for size in thumbnail_sizes()}
+
+
+def delete_thumbnails(content_hash: str, owner_id: int) -> None:
+    """Remove a deleted upload's thumbnails unless another upload of its owner has the same bytes."""
+    from .models import Image as ImageModel
+
+    if not content_hash or ImageModel.objects.filter(user_id=owner_id, content_hash=content_hash).exists():
+        return
+    for size in thumbnail_sizes():
+        path = os.path.join(settings.MEDIA_ROOT, thumbnail_name(content_hash, size, owner_id))
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _save_atomic(image: Image.Image, path: str) -> None:
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".webp")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            image.save(handle, "WEBP", quality=getattr(settings, "THUMBNAIL_QUALITY", 80), method=4)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def generate_thumbnails(path: str, content_hash: Optional[str] = None, force: bool = False,
+                        owner_id: Optional[int] = None) -> str:
+    """Write every missing thumbnail size for the image at ``path``; return its content hash.
+
+    The source is decoded once, in JPEG draft mode at the largest size, and
+    each smaller size is resized from the previous one. Pass the uploader's
+    ``owner_id`` for uploads (see ``thumbnail_name``).
+    """
+    content_hash = content_hash or hash_path(path)
+    sizes = thumbnail_sizes()
+    targets = {size: os.path.join(settings.MEDIA_ROOT, thumbnail_name(content_hash, size, owner_id)) for size in sizes}
+    missing = [size for size in sizes if force or not os.path.exists(targets[size])]
+    if not missing:
+        return content_hash
+
+    image = _open_image(path)
+    image.draft("RGB", (sizes[-1], sizes[-1]))
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info or "A" in image.getbands() else "RGB")
+
+    for size in reversed(sizes):
+        image.thumbnail((size, size), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        if size in missing:
+            _save_atomic(image, targets[size])
+    return content_hash
+
+
+def ensure_thumbnails(instance, content_hash: Optional[str] = None) -> None:
+    """Generate thumbnails for a saved ``Image``/``DatasetImage`` and record its hash.
+
+    Pass ``content_hash`` when the caller already hashed the original bytes.
+    """
+    content_hash = generate_thumbnails(instance.image.path, content_hash or instance.content_hash or None,
+                                       owner_id=getattr(instance, "user_id", None))
+    if instance.content_hash != content_hash:
+        instance.content_hash = content_hash
+        type(instance).objects.filter(pk=instance.pk).update(content_hash=content_hash)
+
+
+# ---------------------------------------------------------------------
+# Bulk backfill
+# ---------------------------------------------------------------------
+
+def _init_worker() -> None:
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+
+def _thumbnail_job(item: Tuple[int, str, bool, Optional[int]]) -> Tuple[int, Optional[str], Optional[str]]:
+    pk, path, force, owner_id = item
+    try:
+        return pk, generate_thumbnails(path, force=force, owner_id=owner_id), None
+    except Exception as exc:  # pylint: disable=broad-except
+        return pk, None, str(exc)
+
+
+def _pending_pages(model, force: bool, page_size: int) -> Iterator[List[Tuple[int, str, Optional[int]]]]:
+    """Keyset-paginate rows that still need thumbnails, with the owner of uploads."""
+    storage = model._meta.get_field("image").storage
+    queryset = model.objects.all() if force else model.objects.filter(content_hash="")
+    owner = "user_id" if any(field.attname == "user_id" for field in model._meta.concrete_fields) else None
+    fields = ("pk", "image", owner) if owner else ("pk", "image")
+    last_pk = 0
+    while True:
+        page = list(queryset.filter(pk__gt=last_pk).order_by("pk").values_list(*fields)[:page_size])
+        if not page:
+            return
+        yield [(row[0], storage.path(row[1]), row[2] if owner else None) for row in page]
+        last_pk = page[-1][0]
+
+
+def backfill_thumbnails(workers: int, batch_size: int = 200, force: bool = False, progress=None) -> dict:
+    """Generate thumbnails for every ``Image`` and ``DatasetImage`` that lacks them."""
+    from .models import DatasetImage, Image as ImageModel
+
+    stats = {"processed": 0, "errors": 0}
+    pool = multiprocessing.Pool(workers, initializer=_init_worker) if workers > 0 else None
+    try:
+        for model in (ImageModel, DatasetImage):
+            for page in _pending_pages(model, force, batch_size):
+                jobs = [(pk, path, force, owner_id) for pk, path, owner_id in page]
+                results = pool.map(_thumbnail_job, jobs) if pool else [_thumbnail_job(job) for job in jobs]
+
+                done = [model(pk=pk, content_hash=content_hash) for pk, content_hash, error in results if not error]
+                with transaction.atomic():
+                    model.objects.bulk_update(done, ["content_hash"])
+                for pk, _, error in results:
+                    if error:
+                        logger.warning("Could not thumbnail %s %s: %s", model.__name__, pk, error)
+
+                stats["processed"] += len(done)
+                stats["errors"] += len(results) - len(done)
+                if progress:
+                    progress(dict(stats))
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    return stats
@@ -1,6 +1,6 @@
 from django.urls import path
 from .views import (
-    ImageUploadView, ImageListView, ImageDetailView,
+    ImageUploadView, ImageListView, ImageDetailView, IngestJobDetailView,
     search_view, stats_view
 )
 
@@ -8,5 +8,6 @@ urlpatterns = [
     path('upload/', ImageUploadView.as_view(), name='image-upload'),
     path('list/', ImageListView.as_view(), name='image-list'),
     path('<int:pk>/', ImageDetailView.as_view(), name='image-detail'),
+    path('jobs/<int:pk>/', IngestJobDetailView.as_view(), name='ingest-job-detail'),
 ]
 
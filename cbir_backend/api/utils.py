@@ -1,25 +1,33 @@
 """Compatibility layer for CLIP and FAISS utilities."""
 
 from .clip_utils import (  # noqa: F401
+    bytes_to_features,
+    encode_text,
     extract_features,
+    extract_features_batch,
+    features_to_bytes,
     features_to_json,
     get_device,
     json_to_features,
     load_clip_model,
 )
 from .search_engine import (  # noqa: F401
-    initialize_faiss_index,
+    invalidate_partitions,
     rebuild_faiss_index,
     search_similar_images,
 )
 
 __all__ = [
+    "bytes_to_features",
+    "encode_text",
     "extract_features",
+    "extract_features_batch",
+    "features_to_bytes",
     "features_to_json",
     "get_device",
     "json_to_features",
     "load_clip_model",
-    "initialize_faiss_index",
+    "invalidate_partitions",
     "rebuild_faiss_index",
     "search_similar_images",
 ]
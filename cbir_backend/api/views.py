@@ -1,19 +1,46 @@
 from rest_framework import status, generics
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
-from django.db.models import Count
-from django.utils import timezone
-from datetime import timedelta
-
-from .models import Image, SearchHistory
-from .serializers import ImageSerializer
-from .utils import extract_features, features_to_json, search_similar_images
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import quote_etag
+import hashlib
+import logging
+from PIL.Image import DecompressionBombError
+
+from .models import Image, IngestJob
+from .serializers import ImageSerializer, IngestJobSerializer
+from .utils import encode_text, extract_features, extract_features_batch, features_to_bytes, invalidate_partitions
+from .search_engine import SOURCE_DATASET, SOURCE_UPLOAD, index_fingerprint, search_partitions
+from . import history, metrics, search_cache, stats
+from .embedding_cache import extract_features_cached
+from .ingest import enqueue_image
+from .media import media_url, signature_window
+from .pagination import ImageCursorPagination
+from .thumbnails import ensure_thumbnails, thumbnail_urls
+from .warmup import readiness
 from .permissions import IsOwner, IsAdmin
 from .gpu_status import get_gpu_status
 from users.models import User
 
+logger = logging.getLogger(__name__)
+
+
+def _make_thumbnails(image, content_hash=None):
+    """Create the upload's thumbnails; a failure leaves the original URL in use."""
+    try:
+        ensure_thumbnails(image, content_hash)
+    except Exception:
+        logger.exception("Thumbnail generation failed for image %s", image.id)
+
+
+def _vectors_changed(owner_id):
+    """Refresh in-memory indexes (and so retire cached results) after an upload or delete."""
+    invalidate_partitions(owner_id)
+
 
 # =====================================================================
 # 📸 Upload Image View
@@ -35,48 +62,101 @@ class ImageUploadView(generics.CreateAPIView):
         if not image_file.content_type.startswith('image/'):
             return Response({'error': 'File must be an image.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            # Extract CLIP or CNN features (GPU if available)
-            features = extract_features(image_file)
-            features_json = features_to_json(features)
-
-            # Reset file pointer
-            image_file.seek(0)
-
-            # Save image record
+        if self._wants_async(request):
+            # Store now, embed later in the ingest_worker process
             image = Image.objects.create(
                 user=request.user,
                 image=image_file,
                 filename=image_file.name,
-                feature_vector=features_json,
             )
-
+            job = enqueue_image(image)
             serializer = self.get_serializer(image, context={'request': request})
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            return Response({'job_id': job.id, 'status': job.status, 'image': serializer.data},
+                            status=status.HTTP_202_ACCEPTED)
 
+        try:
+            # Extract CLIP features, reusing the embedding of identical bytes
+            with metrics.span('hash'):
+                content_hash = search_cache.hash_file(image_file)
+            features = extract_features_cached(image_file, content_hash)
+            features_blob = features_to_bytes(features)
+
+            # Reset file pointer
+            image_file.seek(0)
+
+            # Save image record
+            with metrics.span('save'):
+                image = Image.objects.create(
+                    user=request.user,
+                    image=image_file,
+                    filename=image_file.name,
+                    feature_vector=features_blob,
+                )
+            with metrics.span('index'):
+                _vectors_changed(request.user.id)
+            with metrics.span('thumbnails'):
+                _make_thumbnails(image, content_hash)
+
+            with metrics.span('serialize'):
+                serializer = self.get_serializer(image, context={'request': request})
+                data = serializer.data
+            return Response(data, status=status.HTTP_201_CREATED)
+
+        except DecompressionBombError as e:
+            return Response({'error': str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
         except Exception as e:
             return Response({'error': f'Error processing image: {str(e)}'},
                             status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @staticmethod
+    def _wants_async(request):
+        """Queue the upload when asked to, or when ASYNC_INGESTION is on by default."""
+        value = request.data.get('async', request.query_params.get('async'))
+        if value is None:
+            return getattr(settings, 'ASYNC_INGESTION', False)
+        return str(value).lower() in ('1', 'true', 'yes')
+
+
+class IngestJobDetailView(generics.RetrieveAPIView):
+    """Poll the status of a queued upload."""
+    permission_classes = [IsAuthenticated]
+    serializer_class = IngestJobSerializer
+
+    def get_queryset(self):
+        user = self.request.user
+        if user.is_admin():
+            return IngestJob.objects.all()
+        return IngestJob.objects.filter(image__user=user)
+
 
 # =====================================================================
 # 🖼️ List Images View
 # =====================================================================
 class ImageListView(generics.ListAPIView):
-    """List user's images (or all if admin)."""
+    """List user's images (or all if admin), one keyset page at a time.
+
+    Pages carry an ETag derived from the rows on them and the media signing
+    window, so a client that revalidates an unchanged page with
+    ``If-None-Match`` gets a 304 until the signed URLs in it rotate.
+    """
     permission_classes = [IsAuthenticated]
     serializer_class = ImageSerializer
+    pagination_class = ImageCursorPagination
 
     def get_queryset(self):
         user = self.request.user
-        print(f"📸 Listing images for: {user.username} (role={getattr(user, 'role', '')}, staff={user.is_staff}, super={user.is_superuser})")
+        logger.debug("Listing images for %s (role=%s, staff=%s, super=%s)",
+                     user.username, getattr(user, 'role', ''), user.is_staff, user.is_superuser)
+
+        # The serializer never reads the vector, and prints the owner's username
+        images = Image.objects.select_related('user').defer('feature_vector')
 
         # ✅ Allow admins/staff/custom-role admins to see all images
         if getattr(user, "is_superuser", False) or getattr(user, "is_staff", False) or getattr(user, "role", "") == "admin":
-            return Image.objects.all().order_by('-uploaded_at')
+            return images
 
         # ✅ Normal users see only their images
-        return Image.objects.filter(user=user).order_by('-uploaded_at')
+        return images.filter(user=user)
 
     def get_serializer_context(self):
         """Add request context for full image URLs."""
@@ -84,6 +164,35 @@ class ImageListView(generics.ListAPIView):
         context.update({"request": self.request})
         return context
 
+    def _page_etag(self, page):
+        """Strong validator over everything the serialized page depends on."""
+        digest = hashlib.sha256()
+        digest.update(f"{self.request.user.pk}|{self.request.get_host()}|{self.request.get_full_path()}".encode())
+        digest.update(f"|{self.paginator.get_next_link()}|{self.paginator.get_previous_link()}".encode())
+        # Signed media URLs in the body change with the window
+        digest.update(f"|{signature_window()}".encode())
+        for image in page:
+            digest.update(f"|{image.pk}:{image.image.name}:{image.filename}:{image.content_hash}:"
+                          f"{image.uploaded_at.isoformat()}:{image.user.username}".encode())
+        return quote_etag(digest.hexdigest()[:32])
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        etag = self._page_etag(page)
+
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            serializer = self.get_serializer(page, many=True)
+            response = self.get_paginated_response(serializer.data)
+
+        # Revalidate every time: pages change as images are uploaded or deleted
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, no-cache"
+        patch_vary_headers(response, ["Authorization"])
+        return response
+
 
 # =====================================================================
 # 🗑️ Retrieve / Delete Image View
@@ -102,6 +211,10 @@ class ImageDetailView(generics.RetrieveDestroyAPIView):
 
         return Image.objects.filter(user=user)
 
+    def perform_destroy(self, instance):
+        instance.delete()
+        _vectors_changed(instance.user_id)
+
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context.update({"request": self.request})
@@ -112,9 +225,52 @@ class ImageDetailView(generics.RetrieveDestroyAPIView):
 # 🔍 Image Search View
 # =====================================================================
 from api.models import DatasetImage, Image
-import numpy as np
 import os
 
+
+def _serialize_matches(request, hits_per_query):
+    """Build result dicts for the ``search_partitions`` hits only, one list per query."""
+    wanted = {SOURCE_UPLOAD: set(), SOURCE_DATASET: set()}
+    for hits in hits_per_query:
+        for _, source, record_id in hits:
+            wanted[source].add(record_id)
+
+    with metrics.span('orm'):
+        records = {
+            SOURCE_UPLOAD: Image.objects.only('id', 'user', 'image', 'filename', 'content_hash').in_bulk(wanted[SOURCE_UPLOAD]),
+            SOURCE_DATASET: DatasetImage.objects.only('id', 'image', 'filename', 'content_hash').in_bulk(
+                wanted[SOURCE_DATASET]
+            ),
+        }
+
+    with metrics.span('serialize'):
+        all_results = []
+        for hits in hits_per_query:
+            results = []
+            for score, source, record_id in hits:
+                record = records[source].get(record_id)
+                if record is None:
+                    continue
+
+                if source == SOURCE_UPLOAD:
+                    filename = record.filename
+                    folder = "user_uploads"
+                else:
+                    filename = record.filename.replace("\\", "/")
+                    folder_name = os.path.dirname(filename)
+                    folder = folder_name.split("/")[-1] if "/" in folder_name else folder_name
+
+                results.append({
+                    "filename": filename,
+                    "folder": folder,
+                    "image_url": media_url(record.image.name, request),
+                    "thumbnails": thumbnail_urls(record.content_hash, request, getattr(record, 'user_id', None)),
+                    "score": round(float(score) * 100, 2)
+                })
+            all_results.append(results)
+        return all_results
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def search_view(request):
@@ -129,51 +285,150 @@ def search_view(request):
         return Response({'error': 'File must be an image.'}, status=status.HTTP_400_BAD_REQUEST)
 
     try:
-        # Step 1: Extract and normalize query features
-        query_features = np.array(extract_features(image_file)).astype(np.float32)
-        query_features /= np.linalg.norm(query_features)
+        # Step 1: Serve repeated queries from the result cache
+        with metrics.span('cache'):
+            cache_key = search_cache.make_key(
+                search_cache.hash_file(image_file), top_k,
+                search_cache.visibility_scope(request.user), request.get_host(), index_fingerprint(request.user),
+            )
+            all_results = search_cache.get_results(cache_key)
+        cache_status = 'hit'
 
-        all_results = []
+        if all_results is None:
+            cache_status = 'miss'
 
-        # Step 2: Search in user-uploaded images (Image table)
-        for user_img in Image.objects.exclude(feature_vector__isnull=True):
-            try:
-                fv = np.array(eval(user_img.feature_vector)).astype(np.float32)
-                fv /= np.linalg.norm(fv)
-                sim = float(np.dot(query_features, fv))
-                all_results.append({
-                    "filename": user_img.filename,
-                    "folder": "user_uploads",
-                    "image_url": request.build_absolute_uri(user_img.image.url),
-                    "score": round(sim * 100, 2)
-                })
-            except Exception:
-                continue
-
-        # Step 3: Search in preloaded dataset images (DatasetImage table)
-        for dataset_img in DatasetImage.objects.exclude(feature_vector__isnull=True):
-            try:
-                fv = np.array(dataset_img.feature_vector).astype(np.float32)
-                fv /= np.linalg.norm(fv)
-                sim = float(np.dot(query_features, fv))
-                folder_name = os.path.dirname(dataset_img.filename).replace("\\", "/")
-                all_results.append({
-                    "filename": dataset_img.filename.replace("\\", "/"),
-                    "folder": folder_name.split("/")[-1] if "/" in folder_name else folder_name,
-                    "image_url": request.build_absolute_uri(dataset_img.image.url),
-                    "score": round(sim * 100, 2)
-                })
-            except Exception:
-                continue
+            # Step 2: Extract query features (decode, preprocess and encode spans)
+            query_features = extract_features(image_file)
+
+            # Step 3: Score against the dataset and the uploads this user may see
+            with metrics.span('score'):
+                hits = search_partitions(query_features, top_k, request.user)
+
+            # Step 4: Fetch and serialize only the top-k winners
+            all_results = _serialize_matches(request, hits)[0]
+            search_cache.set_results(cache_key, all_results)
 
-        # Step 4: Sort by similarity
-        all_results = sorted(all_results, key=lambda x: x['score'], reverse=True)[:top_k]
+        # Step 5: Queue search history (written in batches off the request path)
+        with metrics.span('history'):
+            history.record_search(request.user, len(all_results))
 
-        # Step 5: Save search history
-        SearchHistory.objects.create(user=request.user, results_count=len(all_results))
+        response = Response({"results": all_results, "count": len(all_results)})
+        response['X-Search-Cache'] = cache_status
+        return response
 
-        return Response({"results": all_results, "count": len(all_results)})
+    except DecompressionBombError as e:
+        return Response({'error': str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    except Exception as e:
+        return Response({'error': f'Error during search: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def batch_search_view(request):
+    """Search with several query images at once and return top-k matches per image."""
+    image_files = request.FILES.getlist('images')
+    if not image_files:
+        return Response({'error': 'No query images provided.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    max_images = getattr(settings, 'SEARCH_BATCH_MAX_IMAGES', 50)
+    if len(image_files) > max_images:
+        return Response({'error': f'At most {max_images} images per batch.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    top_k = min(int(request.data.get('top_k', 10)), 200)  # prevent huge queries
+
+    for image_file in image_files:
+        if not image_file.content_type.startswith('image/'):
+            return Response({'error': f'File {image_file.name} must be an image.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        # Step 1: One batched CLIP forward pass for every query image
+        query_features = extract_features_batch(image_files)
+
+        # Step 2: One index search per visible partition scores every query
+        with metrics.span('score'):
+            hits = search_partitions(query_features, top_k, request.user)
+
+        # Step 3: Fetch and serialize the winners of all queries together
+        per_query = _serialize_matches(request, hits)
+
+        # Step 4: Queue search history
+        with metrics.span('history'):
+            history.record_searches(request.user, [len(results) for results in per_query])
+
+        queries = [
+            {"filename": image_file.name, "results": results, "count": len(results)}
+            for image_file, results in zip(image_files, per_query)
+        ]
+        return Response({"queries": queries, "count": len(queries)})
+
+    except DecompressionBombError as e:
+        return Response({'error': str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    except Exception as e:
+        return Response({'error': f'Error during search: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def text_search_view(request):
+    """Search images by a text description, optionally blended with a query image.
+
+    With both ``query`` and ``image``, the embeddings are mixed as
+    ``alpha * text + (1 - alpha) * image`` (``alpha`` defaults to 0.5).
+    """
+    query = ' '.join(str(request.data.get('query', '')).split())
+    image_file = request.FILES.get('image')
+    top_k = min(int(request.data.get('top_k', 10)), 200)
+
+    if not query:
+        return Response({'error': 'No text query provided.'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(query) > settings.SEARCH_TEXT_MAX_LENGTH:
+        return Response({'error': f'Text query is limited to {settings.SEARCH_TEXT_MAX_LENGTH} characters.'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    if image_file is not None and not image_file.content_type.startswith('image/'):
+        return Response({'error': 'File must be an image.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        alpha = float(request.data.get('alpha', 0.5)) if image_file is not None else 1.0
+    except (TypeError, ValueError):
+        alpha = -1.0
+    if not 0.0 <= alpha <= 1.0:
+        return Response({'error': 'alpha must be a number between 0 and 1.'}, status=status.HTTP_400_BAD_REQUEST)
 
+    try:
+        # Step 1: Serve repeated queries from the result cache
+        image_hash = search_cache.hash_file(image_file) if image_file is not None else ''
+        query_hash = hashlib.sha256(f"text:{query.lower()}|alpha:{alpha}|image:{image_hash}".encode()).hexdigest()
+        cache_key = search_cache.make_key(
+            query_hash, top_k, search_cache.visibility_scope(request.user), request.get_host(),
+            index_fingerprint(request.user),
+        )
+        all_results = search_cache.get_results(cache_key)
+        cache_status = 'hit'
+
+        if all_results is None:
+            cache_status = 'miss'
+
+            # Step 2: Embed the text (LRU-cached) and blend in the image if given
+            with metrics.span('encode_text'):
+                query_features = alpha * encode_text(query)
+            if image_file is not None and alpha < 1.0:
+                query_features = query_features + (1.0 - alpha) * extract_features(image_file)
+
+            # Step 3: Score against the same partitions as image search
+            with metrics.span('score'):
+                hits = search_partitions(query_features, top_k, request.user)
+            all_results = _serialize_matches(request, hits)[0]
+            search_cache.set_results(cache_key, all_results)
+
+        # Step 4: Queue search history
+        with metrics.span('history'):
+            history.record_search(request.user, len(all_results))
+
+        response = Response({"query": query, "results": all_results, "count": len(all_results)})
+        response['X-Search-Cache'] = cache_status
+        return response
+
+    except DecompressionBombError as e:
+        return Response({'error': str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
     except Exception as e:
         return Response({'error': f'Error during search: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -187,32 +442,36 @@ def stats_view(request):
     """Return admin-only system and usage stats."""
     gpu_status = get_gpu_status()
 
-    total_users = User.objects.count()
-    total_images = Image.objects.count()
-    total_searches = SearchHistory.objects.count()
-
-    # Past 7 days activity
-    week_ago = timezone.now() - timedelta(days=7)
-    recent_uploads = Image.objects.filter(uploaded_at__gte=week_ago).count()
-    recent_searches = SearchHistory.objects.filter(searched_at__gte=week_ago).count()
-
-    users_by_role = User.objects.values('role').annotate(count=Count('id'))
+    # Sums over the daily rollup table, briefly cached (see api/stats.py)
+    usage = stats.dashboard()
 
     return Response({
         'gpu': {
             'available': gpu_status['gpu_available'],
             'name': gpu_status['gpu_name'],
         },
-        'users': {
-            'total': total_users,
-            'by_role': list(users_by_role),
-        },
-        'images': {
-            'total': total_images,
-            'recent_uploads': recent_uploads,
-        },
-        'searches': {
-            'total': total_searches,
-            'recent': recent_searches,
-        },
+        **usage,
     })
+
+
+# =====================================================================
+# 📈 Prometheus Metrics (Admin Only)
+# =====================================================================
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdmin])
+def metrics_view(request):
+    """Expose this worker's stage histograms, counters and index sizes to Prometheus."""
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# =====================================================================
+# 🚦 Readiness Probe
+# =====================================================================
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def ready_view(request):
+    """Report whether this worker has the model and vector index warmed up."""
+    state = readiness()
+    return Response(state, status=status.HTTP_200_OK if state['ready'] else status.HTTP_503_SERVICE_UNAVAILABLE)
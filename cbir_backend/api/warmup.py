@@ -0,0 +1,132 @@
+"""Model preloading, warm-up and readiness tracking.
+
+``ApiConfig.ready`` loads the CLIP weights when ``CLIP_PRELOAD`` is on, so
+a gunicorn master running with ``preload_app`` shares them copy-on-write
+with every forked worker. Each worker then calls ``warm_up`` (see
+``gunicorn.conf.py``) to load the encoder, run a first forward pass and
+load the vector index before it accepts traffic. Under any other server
+the first ``/api/ready/`` probe starts the same warm-up on a background
+thread; the probe reports the result.
+"""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_state = {"model": False, "index": False}
+_state_lock = threading.Lock()
+_warm_up_started = False
+_retry_at = 0.0
+
+# Seconds before a readiness probe retries a failed warm-up
+RETRY_SECONDS = 30.0
+
+
+def _mark(component: str) -> None:
+    with _state_lock:
+        _state[component] = True
+
+
+def _uses_clip_server() -> bool:
+    import os
+
+    socket_path = getattr(settings, "CLIP_SERVER_SOCKET", "")
+    return bool(socket_path) and os.path.exists(socket_path)
+
+
+def preload_model() -> None:
+    """Load the CLIP image and text encoders into this process (skipped when a CLIP server is used)."""
+    if _uses_clip_server():
+        return
+    from .clip_utils import load_backend, load_text_encoder
+
+    started = time.perf_counter()
+    load_backend()
+    load_text_encoder()
+    logger.info("CLIP model preloaded in %.2fs", time.perf_counter() - started)
+
+
+def warm_up_model() -> None:
+    """Load the encoders, then run one image and one text pass so lazy initialisation happens before real traffic."""
+    from PIL import Image
+
+    from .clip_utils import encode_text_batch, extract_features
+
+    preload_model()
+    if getattr(settings, "CLIP_WARMUP", True):
+        started = time.perf_counter()
+        extract_features(Image.new("RGB", (224, 224)))
+        if not _uses_clip_server():
+            encode_text_batch(["a photo"])
+        logger.info("CLIP warm-up forward pass took %.2fs", time.perf_counter() - started)
+    _mark("model")
+
+
+def preload_index() -> None:
+    """Load the shared dataset partition searched by every request.
+
+    Upload partitions are per user (all uploads for admins) and load on
+    first use.
+    """
+    from .search_engine import PARTITION_DATASET, get_partition
+
+    started = time.perf_counter()
+    partition = get_partition(PARTITION_DATASET)
+    logger.info("Vector index preloaded with %d vectors in %.2fs", len(partition.ids), time.perf_counter() - started)
+    _mark("index")
+
+
+def warm_up() -> None:
+    """Warm the model and the index; failures leave the worker not ready.
+
+    A failed warm-up is retried by a readiness probe ``RETRY_SECONDS`` later.
+    """
+    global _warm_up_started, _retry_at
+    with _state_lock:
+        _warm_up_started = True
+
+    failed = False
+    for step in (warm_up_model, preload_index):
+        try:
+            step()
+        except Exception:  # pylint: disable=broad-except
+            failed = True
+            logger.exception("Warm-up step %s failed", step.__name__)
+
+    if failed:
+        with _state_lock:
+            _warm_up_started = False
+            _retry_at = time.monotonic() + RETRY_SECONDS
+
+
+def _warm_up_in_background() -> None:
+    from django.db import connection
+
+    try:
+        warm_up()
+    finally:
+        connection.close()
+
+
+def start_warm_up() -> bool:
+    """Start ``warm_up`` on a background thread unless it already ran or is running here."""
+    global _warm_up_started
+    with _state_lock:
+        if _warm_up_started or time.monotonic() < _retry_at:
+            return False
+        _warm_up_started = True
+    threading.Thread(target=_warm_up_in_background, name="cbir-warm-up", daemon=True).start()
+    return True
+
+
+def readiness() -> dict:
+    """Return which components are hot in this process, starting the warm-up if nothing has."""
+    start_warm_up()
+    with _state_lock:
+        state = dict(_state)
+    state["ready"] = state["model"] and state["index"]
+    return state
@@ -0,0 +1,18 @@
+"""Reproducible performance benchmarks for the CBIR backend.
+
+Run from ``cbir_backend/``::
+
+    python -m benchmarks run --scale 1k --output baseline.json
+    python -m benchmarks run --scale 100k --suites index_build,search_similar
+    python -m benchmarks compare baseline.json current.json --threshold 0.10
+
+``run`` builds a seeded synthetic corpus (clustered unit vectors and
+generated photos), times each suite against a throwaway database and
+writes throughput, p50/p95/p99 latency and the process's peak RSS so far
+(cumulative across the suites of a run) to JSON. ``compare``
+exits non-zero when a latency or throughput figure regressed by more than
+the threshold.
+
+``python -m benchmarks.loadtest`` drives a running server over HTTP at
+increasing request rates to find where it saturates.
+"""
@@ -0,0 +1,191 @@
+"""Command line entry point: ``python -m benchmarks {run,compare}``."""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from importlib import metadata
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Higher is worse for latencies, lower is worse for throughput
+LATENCY_KEYS = ("p50_ms", "p95_ms", "p99_ms")
+THROUGHPUT_KEY = "throughput"
+
+
+def _setup_django(database_path: str, media_root: str) -> None:
+    sys.path.insert(0, BASE_DIR)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "cbir_backend.settings")
+    import django
+    from django.conf import settings
+
+    # Keep the benchmark corpus out of the real database and media folder
+    settings.DATABASES["default"]["TEST"] = {"NAME": database_path}
+    settings.MEDIA_ROOT = media_root
+    django.setup()
+
+
+def _package_version(name: str) -> str:
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return ""
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def _environment() -> dict:
+    from django.conf import settings
+
+    from api.search_engine import get_index_config
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "packages": {name: _package_version(name) for name in ("numpy", "faiss-cpu", "torch", "onnxruntime", "Pillow")},
+        "clip_backend": getattr(settings, "CLIP_BACKEND", "torch"),
+        "vector_index": get_index_config()["TYPE"],
+        "feature_vector_dtype": getattr(settings, "FEATURE_VECTOR_DTYPE", "float32"),
+    }
+
+
+def run(args) -> int:
+    from .corpus import SCALES
+
+    names = args.suites.split(",") if args.suites else None
+    with tempfile.TemporaryDirectory(prefix="cbir-bench-") as workdir:
+        _setup_django(os.path.join(workdir, "bench.sqlite3"), os.path.join(workdir, "media"))
+
+        from django.core.exceptions import ImproperlyConfigured
+        from django.db import connection
+
+        from .suites import SUITES, Context
+
+        unknown = set(names or ()) - set(SUITES)
+        if unknown:
+            print(f"❌ Unknown suites: {', '.join(sorted(unknown))} (choose from {', '.join(SUITES)})")
+            return 2
+
+        image_dir = os.path.join(workdir, "images")
+        os.makedirs(image_dir)
+        ctx = Context(corpus_size=SCALES[args.scale], image_dir=image_dir, images=args.images,
+                      batch_size=args.batch_size, queries=args.queries, requests=args.requests,
+                      top_k=args.top_k, repeat=args.repeat, seed=args.seed)
+
+        report = {"scale": args.scale, "corpus_size": ctx.corpus_size, "environment": _environment(), "suites": {}}
+        print(f"🚀 Benchmarking at {args.scale} ({ctx.corpus_size:,} vectors)")
+
+        old_name = connection.creation.create_test_db(verbosity=0)
+        try:
+            for name, suite in SUITES.items():
+                if names and name not in names:
+                    continue
+                try:
+                    result = suite(ctx)
+                except (ImportError, ImproperlyConfigured) as exc:
+                    # e.g. no torch/CLIP on this machine for the extraction suites
+                    result = {"skipped": str(exc)}
+                    print(f"  ⏭️ {name}: skipped ({exc})")
+                else:
+                    print(f"  ✅ {name}: p50 {result['p50_ms']:.2f} ms, p95 {result['p95_ms']:.2f} ms, "
+                          f"p99 {result['p99_ms']:.2f} ms, {result['throughput']:,.1f} {result['unit']}, "
+                          f"process peak RSS so far {result['peak_rss_mb_cumulative']:.0f} MiB")
+                report["suites"][name] = result
+        finally:
+            # Write buffered search history now: the atexit flush would run
+            # after the throwaway database is gone and hit the real one
+            from api import history
+
+            history.flush()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    output = args.output or f"benchmark-{args.scale}.json"
+    with open(output, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"📄 Results written to {output}")
+    return 0
+
+
+def _change(key: str, before: float, after: float) -> float:
+    """Relative regression: positive means worse."""
+    if not before:
+        return 0.0
+    if key == THROUGHPUT_KEY:
+        return before / after - 1 if after else float("inf")
+    return after / before - 1
+
+
+def compare(args) -> int:
+    with open(args.baseline, encoding="utf-8") as handle:
+        baseline = json.load(handle)
+    with open(args.current, encoding="utf-8") as handle:
+        current = json.load(handle)
+
+    if baseline.get("scale") != current.get("scale"):
+        print(f"⚠️ Comparing different scales: {baseline.get('scale')} vs {current.get('scale')}")
+
+    regressions = []
+    print(f"{'suite':<16} {'metric':<11} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, before in baseline.get("suites", {}).items():
+        after = current.get("suites", {}).get(name)
+        if after is None or "skipped" in before or "skipped" in after:
+            continue
+        for key in LATENCY_KEYS + (THROUGHPUT_KEY,):
+            change = _change(key, before[key], after[key])
+            flag = " ❌" if change > args.threshold else ""
+            print(f"{name:<16} {key:<11} {before[key]:>12.3f} {after[key]:>12.3f} {change:>+7.1%}{flag}")
+            if flag:
+                regressions.append(f"{name}.{key}")
+
+    if regressions:
+        print(f"❌ {len(regressions)} regressions beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    print(f"✅ No regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+def main(argv=None) -> int:
+    from .corpus import SCALES
+
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.strip())
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the benchmark suites and write a JSON report.")
+    run_parser.add_argument("--scale", choices=SCALES, default="1k", help="Vector corpus size.")
+    run_parser.add_argument("--suites", help="Comma-separated subset of suites (default: all).")
+    run_parser.add_argument("--images", type=int, default=32, help="Generated images for the extraction suites.")
+    run_parser.add_argument("--batch-size", type=int, default=16, help="Images per extract_features_batch call.")
+    run_parser.add_argument("--queries", type=int, default=200, help="Queries per search suite.")
+    run_parser.add_argument("--requests", type=int, default=50, help="Requests for the search_view suite.")
+    run_parser.add_argument("--top-k", type=int, default=10)
+    run_parser.add_argument("--repeat", type=int, default=3, help="Index builds to time.")
+    run_parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic corpus.")
+    run_parser.add_argument("--output", help="JSON report path (default: benchmark-<scale>.json).")
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser("compare", help="Fail when CURRENT regressed against BASELINE.")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10,
+                                help="Allowed relative slowdown before failing (default: 0.10 = 10%%).")
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""Seeded synthetic corpora: CLIP-like unit vectors and photo-like images."""
+
+import io
+import os
+from typing import Iterator, List, Tuple
+
+import numpy as np
+from PIL import Image
+
+SCALES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+DIMENSION = 512
+# Image mix of the extraction and request-path suites: (width, height, format)
+IMAGE_MIX = [
+    (640, 480, "JPEG"),
+    (1920, 1080, "JPEG"),
+    (4032, 3024, "JPEG"),
+    (1024, 768, "PNG"),
+]
+
+
+def random_unit_vectors(count: int, dimension: int = DIMENSION, seed: int = 0,
+                        clusters: int = 100, spread: float = 0.6) -> np.ndarray:
+    """``count`` L2-normalised float32 vectors drawn around ``clusters`` centres.
+
+    Real CLIP embeddings are far from uniform on the sphere; clustering
+    gives IVF-style indexes a realistic structure to partition.
+    """
+    chunks = vector_chunks(count, max(count, 1), dimension, seed, clusters, spread)
+    return next(chunks, np.empty((0, dimension), dtype=np.float32))
+
+
+def vector_chunks(count: int, chunk_size: int = 10_000, dimension: int = DIMENSION, seed: int = 0,
+                  clusters: int = 100, spread: float = 0.6) -> Iterator[np.ndarray]:
+    """Yield the same corpus as ``random_unit_vectors`` in bounded-memory chunks.
+
+    Centres and cluster labels are drawn up front and the noise is drawn
+    chunk by chunk from the same generator, so the concatenated chunks
+    equal ``random_unit_vectors(count, ...)`` whatever ``chunk_size`` is.
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dimension)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=count)
+    for start in range(0, count, chunk_size):
+        vectors = centres[labels[start:start + chunk_size]]
+        vectors += spread * rng.standard_normal((len(vectors), dimension)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        yield vectors
+
+
+def query_vectors(corpus: np.ndarray, count: int, seed: int = 1, noise: float = 0.3) -> np.ndarray:
+    """Queries near random corpus members, as a similar-image search would be."""
+    rng = np.random.default_rng(seed)
+    queries = corpus[rng.integers(0, len(corpus), size=count)].copy()
+    queries += noise * rng.standard_normal(queries.shape).astype(np.float32) / np.sqrt(corpus.shape[1])
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return queries
+
+
+def synthetic_image(width: int, height: int, seed: int) -> Image.Image:
+    """Smooth gradients plus noise, so JPEG and PNG sizes resemble photos."""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    phase = rng.uniform(0, 2 * np.pi, size=3)
+    channels = [
+        127 + 100 * np.sin(x / width * 6 + phase[c]) * np.cos(y / height * 4 + phase[c]) for c in range(3)
+    ]
+    pixels = np.stack(channels, axis=-1) + rng.normal(0, 12, size=(height, width, 3))
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8), "RGB")
+
+
+def encode_image(image: Image.Image, fmt: str) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **({"quality": 90} if fmt == "JPEG" else {}))
+    return buffer.getvalue()
+
+
+def image_mix(count: int, seed: int = 0) -> List[Tuple[str, bytes, str]]:
+    """``count`` encoded images cycling through ``IMAGE_MIX``: (name, bytes, content type)."""
+    images = []
+    for index in range(count):
+        width, height, fmt = IMAGE_MIX[index % len(IMAGE_MIX)]
+        extension = "jpg" if fmt == "JPEG" else fmt.lower()
+        data = encode_image(synthetic_image(width, height, seed + index), fmt)
+        images.append((f"bench_{index}.{extension}", data, f"image/{fmt.lower()}"))
+    return images
+
+
+def write_images(directory: str, count: int, seed: int = 0) -> List[str]:
+    """Write ``image_mix(count)`` to ``directory`` and return the paths."""
+    paths = []
+    for name, data, _ in image_mix(count, seed):
+        path = os.path.join(directory, name)
+        with open(path, "wb") as handle:
+            handle.write(data)
+        paths.append(path)
+    return paths
@@ -0,0 +1,339 @@
+"""Load test the search and upload API of a running (or locally started) server.
+
+    python -m benchmarks.loadtest --start-server --workers 2 --rates 2,4,8,16 --step-duration 30
+    python -m benchmarks.loadtest --url http://127.0.0.1:8000 --username alice --password secret
+
+Virtual users authenticate through ``/api/auth/`` (registering throwaway
+accounts unless credentials are given) and send JWT-authorised
+``POST /api/search/`` and ``POST /api/images/upload/`` requests. Arrivals are
+open-loop: requests are scheduled as a Poisson process at each offered
+rate, whether or not earlier ones have finished, and latency is measured
+from the scheduled time, so queueing inside an overloaded server shows up
+instead of silently lowering the load.
+
+Each rate step reports achieved throughput, p50/p95/p99 latency and error
+rate per operation, plus the mean ``Server-Timing`` stage breakdown. The
+first step that misses the error budget, the p99 objective or the rate it
+actually sent is reported as the saturation point. Uploaded images stay on the
+target server, so point this at a disposable deployment.
+"""
+
+import argparse
+import json
+import os
+import random
+import secrets
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .corpus import image_mix
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEARCH_PATH = "/api/search/"
+UPLOAD_PATH = "/api/images/upload/"
+OPERATIONS = {"search": SEARCH_PATH, "upload": UPLOAD_PATH}
+
+
+# ---------------------------------------------------------------------
+# HTTP helpers
+# ---------------------------------------------------------------------
+
+def _post_json(url: str, payload: dict, timeout: float) -> Tuple[int, dict]:
+    request = urllib.request.Request(url, data=json.dumps(payload).encode(), method="POST",
+                                     headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            status, raw = response.status, response.read()
+    except urllib.error.HTTPError as exc:
+        status, raw = exc.code, exc.read()
+    try:
+        return status, json.loads(raw or b"{}")
+    except ValueError:
+        return status, {"body": raw[:200].decode(errors="replace")}
+
+
+def _multipart(fields: Dict[str, str], files: Dict[str, Tuple[str, bytes, str]]) -> Tuple[bytes, str]:
+    boundary = secrets.token_hex(16)
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, (filename, data, content_type) in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n".encode() + data + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def _server_timing(header: Optional[str]) -> Dict[str, float]:
+    stages = {}
+    for entry in (header or "").split(","):
+        name, _, params = entry.strip().partition(";")
+        if params.startswith("dur="):
+            try:
+                stages[name] = float(params[4:])
+            except ValueError:
+                continue
+    return stages
+
+
+def authenticate(base_url: str, users: int, username: Optional[str], password: Optional[str],
+                 timeout: float) -> List[str]:
+    """Return one access token per virtual user."""
+    if username:
+        status, body = _post_json(f"{base_url}/api/auth/login/", {"username": username, "password": password},
+                                  timeout)
+        if status != 200:
+            raise SystemExit(f"❌ Login as {username} failed ({status}): {body}")
+        return [body["access"]] * users
+
+    tokens = []
+    run_id = secrets.token_hex(3)
+    for index in range(users):
+        name, secret = f"loadtest-{run_id}-{index}", secrets.token_urlsafe(16)
+        status, body = _post_json(
+            f"{base_url}/api/auth/register/",
+            {"username": name, "email": f"{name}@loadtest.invalid", "password": secret, "password2": secret},
+            timeout,
+        )
+        if status != 201:
+            raise SystemExit(f"❌ Registering {name} failed ({status}): {body}")
+        tokens.append(body["access"])
+    return tokens
+
+
+# ---------------------------------------------------------------------
+# Load generation
+# ---------------------------------------------------------------------
+
+class Step:
+    """Results of one offered rate."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {op: [] for op in OPERATIONS}
+        self.statuses: Dict[str, Dict[str, int]] = {op: {} for op in OPERATIONS}
+        self.stages: Dict[str, Dict[str, List[float]]] = {op: {} for op in OPERATIONS}
+        self.cache_hits = 0
+        self.scheduled = 0
+        self.duration = 0.0
+        self.elapsed = 0.0
+
+    def record(self, op: str, latency: float, outcome: str, stages: Dict[str, float], cache_hit: bool) -> None:
+        with self.lock:
+            self.latencies[op].append(latency)
+            self.statuses[op][outcome] = self.statuses[op].get(outcome, 0) + 1
+            for stage, duration in stages.items():
+                self.stages[op].setdefault(stage, []).append(duration)
+            self.cache_hits += cache_hit
+
+    def summary(self) -> dict:
+        operations = {}
+        completed = 0
+        errors = 0
+        for op, samples in self.latencies.items():
+            if not samples:
+                continue
+            millis = np.asarray(samples) * 1000
+            failed = sum(count for outcome, count in self.statuses[op].items() if not outcome.startswith("2"))
+            completed += len(samples)
+            errors += failed
+            operations[op] = {
+                "requests": len(samples),
+                "p50_ms": round(float(np.percentile(millis, 50)), 1),
+                "p95_ms": round(float(np.percentile(millis, 95)), 1),
+                "p99_ms": round(float(np.percentile(millis, 99)), 1),
+                "max_ms": round(float(millis.max()), 1),
+                "error_rate": round(failed / len(samples), 4),
+                "statuses": dict(sorted(self.statuses[op].items())),
+                "server_timing_ms": {stage: round(float(np.mean(values)), 1)
+                                     for stage, values in sorted(self.stages[op].items())},
+            }
+        return {
+            "offered_rate": self.rate,
+            # Poisson arrivals: the rate actually sent differs a little from the target
+            "sent_rate": round(self.scheduled / self.duration, 2) if self.duration else 0.0,
+            "achieved_rate": round(completed / self.elapsed, 2) if self.elapsed else 0.0,
+            "requests": completed,
+            "error_rate": round(errors / completed, 4) if completed else 0.0,
+            "search_cache_hits": self.cache_hits,
+            "operations": operations,
+        }
+
+
+def _send(base_url: str, op: str, token: str, image: Tuple[str, bytes, str], top_k: int,
+          scheduled_at: float, timeout: float, step: Step) -> None:
+    fields = {"top_k": str(top_k)} if op == "search" else {}
+    body, content_type = _multipart(fields, {"image": image})
+    request = urllib.request.Request(f"{base_url}{OPERATIONS[op]}", data=body, method="POST", headers={
+        "Authorization": f"Bearer {token}", "Content-Type": content_type,
+    })
+    stages, cache_hit = {}, False
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            outcome = str(response.status)
+            stages = _server_timing(response.headers.get("Server-Timing"))
+            cache_hit = response.headers.get("X-Search-Cache") == "hit"
+    except urllib.error.HTTPError as exc:
+        exc.read()
+        outcome = str(exc.code)
+        stages = _server_timing(exc.headers.get("Server-Timing"))
+    except (urllib.error.URLError, TimeoutError, ConnectionError) as exc:
+        reason = getattr(exc, "reason", exc)
+        outcome = "timeout" if isinstance(reason, TimeoutError) or "timed out" in str(reason) else "connection"
+    step.record(op, time.perf_counter() - scheduled_at, outcome, stages, cache_hit)
+
+
+def run_step(base_url: str, rate: float, duration: float, tokens: List[str], images: list,
+             mix: Dict[str, float], args, rng: random.Random) -> Step:
+    """Offer ``rate`` requests/s for ``duration`` seconds and wait for them to finish."""
+    step = Step(rate)
+    ops, weights = zip(*mix.items())
+    started = time.perf_counter()
+    next_at = started
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        while True:
+            next_at += rng.expovariate(rate)
+            if next_at - started > duration:
+                break
+            time.sleep(max(0.0, next_at - time.perf_counter()))
+            op = rng.choices(ops, weights)[0]
+            pool.submit(_send, base_url, op, tokens[step.scheduled % len(tokens)], rng.choice(images),
+                        args.top_k, next_at, args.timeout, step)
+            step.scheduled += 1
+    # Includes draining the requests still in flight when arrivals stopped
+    step.elapsed = time.perf_counter() - started
+    step.duration = duration
+    return step
+
+
+def saturated(summary: dict, args) -> Optional[str]:
+    """Why a step counts as past saturation, or ``None``."""
+    if summary["error_rate"] > args.max_error_rate:
+        return f"error rate {summary['error_rate']:.1%}"
+    for op, stats in summary["operations"].items():
+        if stats["p99_ms"] > args.slo_p99_ms:
+            return f"{op} p99 {stats['p99_ms']:.0f} ms > {args.slo_p99_ms:.0f} ms"
+    if summary["achieved_rate"] < 0.9 * summary["sent_rate"]:
+        return f"completed {summary['achieved_rate']}/s of {summary['sent_rate']}/s sent"
+    return None
+
+
+# ---------------------------------------------------------------------
+# Local server
+# ---------------------------------------------------------------------
+
+def start_server(port: int, workers: int, timeout: float) -> subprocess.Popen:
+    """Start gunicorn from ``cbir_backend/`` (picking up gunicorn.conf.py) and wait until it is ready."""
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "cbir_backend.wsgi:application",
+         "--bind", f"127.0.0.1:{port}", "--workers", str(workers)],
+        cwd=BASE_DIR,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"❌ gunicorn exited with status {process.returncode}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/ready/", timeout=2) as response:
+                if response.status == 200:
+                    return process
+        except (urllib.error.URLError, ConnectionError, TimeoutError):
+            pass
+        time.sleep(1)
+    process.terminate()
+    raise SystemExit(f"❌ Server not ready after {timeout:.0f}s")
+
+
+def _parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        op, _, weight = part.partition("=")
+        if op not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation {op!r} (choose from {', '.join(OPERATIONS)})")
+        mix[op] = float(weight or 1)
+    return mix
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.loadtest",
+                                     description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Server to test.")
+    parser.add_argument("--start-server", action="store_true",
+                        help="Start gunicorn locally on --port and test it (stopped afterwards).")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers with --start-server.")
+    parser.add_argument("--ready-timeout", type=float, default=300, help="Seconds to wait for /api/ready/.")
+    parser.add_argument("--username", help="Existing account to use (default: register throwaway users).")
+    parser.add_argument("--password")
+    parser.add_argument("--users", type=int, default=4, help="Virtual users (JWT tokens) to spread requests over.")
+    parser.add_argument("--rates", default="1,2,4,8", help="Offered requests/s, one step each.")
+    parser.add_argument("--step-duration", type=float, default=30, help="Seconds per rate step.")
+    parser.add_argument("--concurrency", type=int, default=32, help="Maximum requests in flight.")
+    parser.add_argument("--mix", type=_parse_mix, default=_parse_mix("search=0.8,upload=0.2"),
+                        help="Operation weights, e.g. search=0.8,upload=0.2.")
+    parser.add_argument("--images", type=int, default=32,
+                        help="Distinct generated images to cycle through (repeats hit the search cache).")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=60, help="Per-request timeout in seconds.")
+    parser.add_argument("--slo-p99-ms", type=float, default=2000, help="p99 latency objective per operation.")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="loadtest.json", help="JSON report path.")
+    args = parser.parse_args(argv)
+
+    rates = [float(rate) for rate in args.rates.split(",")]
+    base_url = f"http://127.0.0.1:{args.port}" if args.start_server else args.url.rstrip("/")
+    server = start_server(args.port, args.workers, args.ready_timeout) if args.start_server else None
+
+    try:
+        print(f"🔐 Authenticating {args.users} virtual users against {base_url}")
+        tokens = authenticate(base_url, args.users, args.username, args.password, args.timeout)
+        print(f"🖼️ Generating {args.images} test images")
+        images = image_mix(args.images, seed=args.seed)
+        rng = random.Random(args.seed)
+
+        report = {"url": base_url, "mix": args.mix, "concurrency": args.concurrency, "steps": [],
+                  "saturation": None}
+        for rate in rates:
+            print(f"🚀 Offering {rate:g} req/s for {args.step_duration:g}s")
+            summary = run_step(base_url, rate, args.step_duration, tokens, images, args.mix, args, rng).summary()
+            report["steps"].append(summary)
+            for op, stats in summary["operations"].items():
+                print(f"  {op:<7} {stats['requests']:>5} req  p50 {stats['p50_ms']:>8.1f} ms  "
+                      f"p95 {stats['p95_ms']:>8.1f} ms  p99 {stats['p99_ms']:>8.1f} ms  "
+                      f"errors {stats['error_rate']:.1%}")
+            print(f"  sent {summary['sent_rate']:g} req/s, completed {summary['achieved_rate']:g} req/s")
+
+            reason = saturated(summary, args)
+            if reason:
+                report["saturation"] = {"offered_rate": rate, "reason": reason}
+                print(f"⚠️ Saturated at {rate:g} req/s: {reason}")
+                break
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=30)
+
+    sustained = [step["offered_rate"] for step in report["steps"]
+                 if report["saturation"] is None or step["offered_rate"] < report["saturation"]["offered_rate"]]
+    report["max_sustained_rate"] = max(sustained) if sustained else None
+    with open(args.output, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"🎯 Max sustained rate: {report['max_sustained_rate']} req/s; report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
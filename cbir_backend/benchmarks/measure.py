@@ -0,0 +1,53 @@
+"""Timing, percentile and memory helpers shared by the suites."""
+
+import resource
+import sys
+import time
+from typing import Callable, List, Optional
+
+import numpy as np
+
+
+def peak_rss_mb() -> float:
+    """High-water resident set size of this process so far, in MiB.
+
+    The mark never goes down, so within one run it covers every suite that
+    ran before the current one too.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def time_calls(func: Callable[[int], object], calls: int, warmup: int = 1) -> List[float]:
+    """Run ``func(i)`` ``warmup`` + ``calls`` times; return the timed durations in seconds."""
+    for index in range(warmup):
+        func(index)
+    durations = []
+    for index in range(warmup, warmup + calls):
+        started = time.perf_counter()
+        func(index)
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def summarize(durations: List[float], items_per_call: int = 1, unit: str = "items/s",
+              extra: Optional[dict] = None) -> dict:
+    """Latency percentiles (ms) and throughput of a list of call durations."""
+    samples = np.asarray(durations, dtype=np.float64) * 1000
+    total = float(np.sum(durations))
+    result = {
+        "calls": len(durations),
+        "items_per_call": items_per_call,
+        "mean_ms": round(float(samples.mean()), 3),
+        "p50_ms": round(float(np.percentile(samples, 50)), 3),
+        "p95_ms": round(float(np.percentile(samples, 95)), 3),
+        "p99_ms": round(float(np.percentile(samples, 99)), 3),
+        "max_ms": round(float(samples.max()), 3),
+        "throughput": round(len(durations) * items_per_call / total, 2) if total else 0.0,
+        "unit": unit,
+        # Process-wide high-water mark, not this suite's own footprint
+        "peak_rss_mb_cumulative": round(peak_rss_mb(), 1),
+    }
+    result.update(extra or {})
+    return result
@@ -0,0 +1,156 @@
+"""Benchmark suites for extraction, index build, search and the search request path.
+
+Every suite takes a ``Context`` and returns a ``measure.summarize`` dict.
+Suites that hit the database run against a throwaway SQLite file created
+by ``run`` (see ``benchmarks.__main__``), never the configured database.
+"""
+
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from . import corpus
+from .measure import summarize, time_calls
+
+# Rows per bulk_create when filling the database corpus
+INSERT_CHUNK = 5_000
+
+
+@dataclass
+class Context:
+    corpus_size: int
+    image_dir: str
+    images: int = 32
+    batch_size: int = 16
+    queries: int = 200
+    requests: int = 50
+    top_k: int = 10
+    repeat: int = 3
+    seed: int = 0
+    _paths: Optional[List[str]] = field(default=None, repr=False)
+    _populated: bool = field(default=False, repr=False)
+
+    @property
+    def image_paths(self) -> List[str]:
+        if self._paths is None:
+            self._paths = corpus.write_images(self.image_dir, self.images, self.seed)
+        return self._paths
+
+    def query_vectors(self) -> np.ndarray:
+        sample = corpus.random_unit_vectors(min(self.corpus_size, 10_000), seed=self.seed)
+        return corpus.query_vectors(sample, self.queries, seed=self.seed + 1)
+
+    def populate(self) -> None:
+        """Store the vector corpus as ``DatasetImage`` rows (once per run)."""
+        if self._populated:
+            return
+        from api.clip_utils import features_to_bytes
+        from api.models import DatasetImage
+
+        for start, chunk in zip(range(0, self.corpus_size, INSERT_CHUNK),
+                                corpus.vector_chunks(self.corpus_size, INSERT_CHUNK, seed=self.seed)):
+            DatasetImage.objects.bulk_create([
+                DatasetImage(image=f"images/bench/{start + offset}.jpg", filename=f"bench/{start + offset}.jpg",
+                             feature_vector=features_to_bytes(vector))
+                for offset, vector in enumerate(chunk)
+            ])
+        self._populated = True
+
+
+def extract_single(ctx: Context) -> dict:
+    """``extract_features`` on one image at a time, across the image mix."""
+    from api.clip_utils import extract_features, load_backend
+
+    load_backend()
+    paths = ctx.image_paths
+    durations = time_calls(lambda i: extract_features(paths[i % len(paths)]), len(paths))
+    return summarize(durations, unit="images/s")
+
+
+def extract_batch(ctx: Context) -> dict:
+    """``extract_features_batch`` on ``batch_size`` images per call."""
+    from api.clip_utils import extract_features_batch, load_backend
+
+    load_backend()
+    paths = ctx.image_paths
+    size = min(ctx.batch_size, len(paths))
+    batches = [paths[start:start + size] for start in range(0, len(paths) - size + 1, size)]
+    durations = time_calls(lambda i: extract_features_batch(batches[i % len(batches)]), len(batches))
+    return summarize(durations, items_per_call=size, unit="images/s", extra={"batch_size": size})
+
+
+def index_build(ctx: Context) -> dict:
+    """``build_index`` over the whole corpus with the configured ``VECTOR_INDEX``."""
+    import faiss  # noqa: F401  (keep the import out of the first timed build)
+
+    from api.search_engine import build_index, get_index_config
+
+    config = get_index_config()
+    if ctx.corpus_size < int(config["FLAT_BELOW"]):
+        config["TYPE"] = "flat"
+    vectors = corpus.random_unit_vectors(ctx.corpus_size, seed=ctx.seed)
+    durations = time_calls(lambda i: build_index(vectors, config), ctx.repeat, warmup=0)
+    return summarize(durations, items_per_call=ctx.corpus_size, unit="vectors/s",
+                     extra={"index_type": config["TYPE"]})
+
+
+def search_similar(ctx: Context) -> dict:
+    """``search_similar_images`` (FAISS partitions plus ORM lookup of the hits)."""
+    from api.search_engine import PARTITION_DATASET, get_partition, search_similar_images
+
+    ctx.populate()
+    partition = get_partition(PARTITION_DATASET)
+    queries = ctx.query_vectors()
+    durations = time_calls(lambda i: search_similar_images(queries[i % len(queries)], ctx.top_k), len(queries))
+    return summarize(durations, unit="queries/s", extra={"index_type": partition.index_type})
+
+
+def partition_search(ctx: Context) -> dict:
+    """``search_partitions``, the scoring step of the search views, without the ORM lookup."""
+    from api.search_engine import PARTITION_DATASET, get_partition, search_partitions
+
+    ctx.populate()
+    partition = get_partition(PARTITION_DATASET)
+    queries = ctx.query_vectors()
+    durations = time_calls(lambda i: search_partitions(queries[i % len(queries)], ctx.top_k), len(queries))
+    return summarize(durations, unit="queries/s", extra={"index_type": partition.index_type})
+
+
+def search_view(ctx: Context) -> dict:
+    """``POST /api/search/`` end to end with distinct images (result cache misses)."""
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+
+    from api.clip_utils import load_backend
+    from users.models import User
+
+    load_backend()
+    ctx.populate()
+    admin, _ = User.objects.get_or_create(username="benchmark-admin", defaults={"role": "admin"})
+    client = APIClient()
+    client.force_authenticate(admin)
+
+    images = corpus.image_mix(ctx.requests + 1, seed=ctx.seed + 1000)
+    statuses: Dict[int, int] = {}
+
+    def request(index: int) -> None:
+        name, data, content_type = images[index]
+        response = client.post(reverse("search"), {"image": SimpleUploadedFile(name, data, content_type),
+                                                   "top_k": ctx.top_k}, format="multipart")
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    durations = time_calls(request, ctx.requests)
+    errors = sum(count for status, count in statuses.items() if status >= 400)
+    return summarize(durations, unit="requests/s", extra={"errors": errors})
+
+
+SUITES: Dict[str, Callable[[Context], dict]] = {
+    "extract_single": extract_single,
+    "extract_batch": extract_batch,
+    "index_build": index_build,
+    "search_similar": search_similar,
+    "partition_search": partition_search,
+    "search_view": search_view,
+}
@@ -56,6 +56,7 @@ INSTALLED_APPS = [
 # ==================================================
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",  # MUST BE FIRST
+    "api.metrics.ServerTimingMiddleware",  # Server-Timing header + request histograms
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -129,6 +130,26 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# /media/ is served by api.media.serve_media. Set MEDIA_SENDFILE to
+# "x-sendfile" (Apache/lighttpd) or "x-accel-redirect" (nginx, with an
+# internal location at MEDIA_ACCEL_PREFIX aliased to MEDIA_ROOT) to let the
+# fronting server stream the bytes after Django's permission checks.
+MEDIA_SENDFILE = os.environ.get("MEDIA_SENDFILE", "")
+MEDIA_ACCEL_PREFIX = os.environ.get("MEDIA_ACCEL_PREFIX", "/protected-media/")
+# Browser cache lifetime of originals (thumbnails are cached as immutable)
+MEDIA_CACHE_MAX_AGE = int(os.environ.get("MEDIA_CACHE_MAX_AGE", "86400"))
+# Lifetime in seconds of the signed URLs handed out for private uploads.
+# URLs are re-signed every half lifetime, so keep half of it above
+# SEARCH_CACHE_TTL (cached results carry them)
+MEDIA_SIGNATURE_MAX_AGE = int(os.environ.get("MEDIA_SIGNATURE_MAX_AGE", "3600"))
+
+# Images with more pixels are rejected before decoding (decompression bombs)
+IMAGE_MAX_PIXELS = int(os.environ.get("IMAGE_MAX_PIXELS", "64000000"))
+
+# WebP thumbnail edge lengths (px) generated for every image, and their quality
+THUMBNAIL_SIZES = tuple(int(size) for size in os.environ.get("THUMBNAIL_SIZES", "128,256,512").split(","))
+THUMBNAIL_QUALITY = int(os.environ.get("THUMBNAIL_QUALITY", "80"))
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # ==================================================
@@ -143,6 +164,10 @@ REST_FRAMEWORK = {
     ),
 }
 
+# Image list pages (keyset pagination); clients may ask for up to the max
+IMAGE_LIST_PAGE_SIZE = int(os.environ.get("IMAGE_LIST_PAGE_SIZE", "50"))
+IMAGE_LIST_MAX_PAGE_SIZE = int(os.environ.get("IMAGE_LIST_MAX_PAGE_SIZE", "200"))
+
 
 # ==================================================
 # JWT (SimpleJWT)
@@ -204,6 +229,114 @@ SWAGGER_SETTINGS = {
     }
 }
 
+# ==================================================
+# CLIP INFERENCE
+# ==================================================
+# Unix socket of the shared `manage.py clip_server` process; when unset or
+# absent, each worker runs CLIP in-process.
+CLIP_SERVER_SOCKET = os.environ.get("CLIP_SERVER_SOCKET", "")
+CLIP_SERVER_TIMEOUT = float(os.environ.get("CLIP_SERVER_TIMEOUT", "30"))
+
+# Load CLIP weights when the app starts (pairs with gunicorn preload_app)
+CLIP_PRELOAD = os.environ.get("CLIP_PRELOAD", "False") == "True"
+# Run a dummy forward pass during worker warm-up
+CLIP_WARMUP = os.environ.get("CLIP_WARMUP", "True") == "True"
+
+# Image encoder backend: "torch" (eager), "onnx" (ONNX Runtime on the CPU,
+# needs the onnxruntime package and `manage.py export_clip_onnx`) or "int8"
+# (dynamically quantized torch, CPU hosts only). Text queries always use the
+# eager torch model, in the CLIP server when one is configured.
+CLIP_BACKEND = os.environ.get("CLIP_BACKEND", "torch")
+CLIP_ONNX_PATH = os.environ.get("CLIP_ONNX_PATH", str(BASE_DIR / "models" / "clip_visual.onnx"))
+# ONNX Runtime intra-op threads (0 = one per physical core)
+CLIP_ONNX_THREADS = int(os.environ.get("CLIP_ONNX_THREADS", "0"))
+# Minimum cosine similarity to torch embeddings for a backend to be accepted
+CLIP_BACKEND_MIN_COSINE = float(os.environ.get("CLIP_BACKEND_MIN_COSINE", "0.99"))
+
+# Text query embeddings kept in each worker's LRU cache
+CLIP_TEXT_CACHE_SIZE = int(os.environ.get("CLIP_TEXT_CACHE_SIZE", "1024"))
+
+# ==================================================
+# CACHES
+# ==================================================
+# Search results use their own cache; point SEARCH_CACHE_BACKEND at a
+# shared backend (e.g. django.core.cache.backends.redis.RedisCache) so
+# every worker sees the same entries. Keys carry the index fingerprint,
+# so writes retire entries whichever backend is used.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "search": {
+        "BACKEND": os.environ.get("SEARCH_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.environ.get("SEARCH_CACHE_LOCATION", "search-results"),
+        "TIMEOUT": int(os.environ.get("SEARCH_CACHE_TTL", "300")),
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.environ.get("SEARCH_CACHE_MAX_ENTRIES", "1000")),
+        },
+    },
+}
+
+# Seconds the admin dashboard figures are served from the default cache
+STATS_CACHE_TTL = int(os.environ.get("STATS_CACHE_TTL", "30"))
+
+SEARCH_CACHE_ALIAS = "search"
+
+# ==================================================
+# SEARCH ENGINE
+# ==================================================
+# Storage dtype of binary feature vectors ("float32" or "float16")
+FEATURE_VECTOR_DTYPE = os.environ.get("FEATURE_VECTOR_DTYPE", "float32")
+
+# Seconds between staleness checks of the in-memory FAISS partitions
+VECTOR_MATRIX_CHECK_INTERVAL = float(os.environ.get("VECTOR_MATRIX_CHECK_INTERVAL", "5"))
+
+# Queue uploads for the ingest_worker command instead of embedding inline
+ASYNC_INGESTION = os.environ.get("ASYNC_INGESTION", "False") == "True"
+
+# Progress and quarantine file of `manage.py index_dataset`
+INDEX_CHECKPOINT_PATH = os.environ.get("INDEX_CHECKPOINT_PATH", str(BASE_DIR / "index_dataset.checkpoint.json"))
+
+# Search history is buffered in-process and written with bulk_create once
+# FLUSH_SIZE events are waiting or every FLUSH_INTERVAL seconds (0 writes
+# synchronously); beyond MAX_BUFFER pending events new ones are dropped
+SEARCH_HISTORY_FLUSH_SIZE = int(os.environ.get("SEARCH_HISTORY_FLUSH_SIZE", "200"))
+SEARCH_HISTORY_FLUSH_INTERVAL = float(os.environ.get("SEARCH_HISTORY_FLUSH_INTERVAL", "2"))
+SEARCH_HISTORY_MAX_BUFFER = int(os.environ.get("SEARCH_HISTORY_MAX_BUFFER", "10000"))
+
+# Maximum number of query images accepted by /api/search/batch/
+SEARCH_BATCH_MAX_IMAGES = int(os.environ.get("SEARCH_BATCH_MAX_IMAGES", "50"))
+# Longest accepted text query (CLIP itself truncates to 77 tokens)
+SEARCH_TEXT_MAX_LENGTH = int(os.environ.get("SEARCH_TEXT_MAX_LENGTH", "300"))
+
+# FAISS index behind the search endpoints: "flat", "ivf", "hnsw",
+# or the compressed "sq8", "pq" and "fp16" (reranked exactly by RERANK_FACTOR)
+VECTOR_INDEX = {
+    "TYPE": os.environ.get("VECTOR_INDEX_TYPE", "flat"),
+    "NLIST": int(os.environ.get("VECTOR_INDEX_NLIST", "1024")),
+    "NPROBE": int(os.environ.get("VECTOR_INDEX_NPROBE", "16")),
+    "HNSW_M": int(os.environ.get("VECTOR_INDEX_HNSW_M", "32")),
+    "EF_CONSTRUCTION": int(os.environ.get("VECTOR_INDEX_EF_CONSTRUCTION", "80")),
+    "EF_SEARCH": int(os.environ.get("VECTOR_INDEX_EF_SEARCH", "64")),
+    "TRAIN_SAMPLE": int(os.environ.get("VECTOR_INDEX_TRAIN_SAMPLE", "100000")),
+    "PQ_M": int(os.environ.get("VECTOR_INDEX_PQ_M", "64")),
+    "PQ_NBITS": int(os.environ.get("VECTOR_INDEX_PQ_NBITS", "8")),
+    "RERANK_FACTOR": int(os.environ.get("VECTOR_INDEX_RERANK_FACTOR", "4")),
+    # Also log recall@10 of every approximate index build (bytes/vector are
+    # always logged; recall costs about one exact search per RECALL_QUERIES query)
+    "RECALL_REPORT": os.environ.get("VECTOR_INDEX_RECALL_REPORT", "False") == "True",
+    "RECALL_QUERIES": int(os.environ.get("VECTOR_INDEX_RECALL_QUERIES", "200")),
+    # Per-user partitions below this size use an exact flat index
+    "FLAT_BELOW": int(os.environ.get("VECTOR_INDEX_FLAT_BELOW", "10000")),
+    # New vectors are added to cached partitions in place; larger batches, and
+    # indexes changed by more than REBUILD_FRACTION since they were trained,
+    # are rebuilt on a background thread
+    "INCREMENTAL_MAX": int(os.environ.get("VECTOR_INDEX_INCREMENTAL_MAX", "10000")),
+    "REBUILD_FRACTION": float(os.environ.get("VECTOR_INDEX_REBUILD_FRACTION", "0.2")),
+    # Memory budget for cached partitions; least recently used ones are evicted
+    "PARTITION_BUDGET_MB": int(os.environ.get("VECTOR_INDEX_PARTITION_BUDGET_MB", "512")),
+}
+
 # ==================================================
 # LOGGING (Optional)
 # ==================================================
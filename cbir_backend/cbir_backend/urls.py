@@ -2,8 +2,10 @@
 URL configuration for cbir_backend project.
 """
 
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 
@@ -16,7 +18,8 @@ from rest_framework_simplejwt.views import (
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
-from api.views import search_view, stats_view
+from api.media import serve_media
+from api.views import batch_search_view, metrics_view, ready_view, search_view, stats_view, text_search_view
 
 # =========================
 # Swagger configuration
@@ -52,16 +55,30 @@ urlpatterns = [
 
     # 🔍 Search & Stats
     path("api/search/", search_view, name="search"),
+    path("api/search/batch/", batch_search_view, name="search-batch"),
+    path("api/search/text/", text_search_view, name="search-text"),
     path("api/stats/", stats_view, name="stats"),
 
+    # 📈 Prometheus scrape target (admin token required)
+    re_path(r"^api/metrics/?$", metrics_view, name="metrics"),
+
+    # 🚦 Readiness probe for load balancers
+    path("api/ready/", ready_view, name="ready"),
+
     # 📘 API Documentation
     path("swagger/", schema_view.with_ui("swagger", cache_timeout=0), name="swagger-ui"),
     path("redoc/", schema_view.with_ui("redoc", cache_timeout=0), name="redoc"),
 ]
 
 # =========================
-# Static & Media (DEV only)
+# Media (uploads, dataset images, thumbnails)
+# =========================
+urlpatterns += [
+    re_path(rf"^{re.escape(settings.MEDIA_URL.lstrip('/'))}(?P<path>.+)$", serve_media, name="media"),
+]
+
+# =========================
+# Static (DEV only)
 # =========================
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
@@ -0,0 +1,33 @@
+"""
+Gunicorn configuration for cbir_backend.
+
+gunicorn reads this file automatically when started from this directory.
+With CLIP_PRELOAD=True the master imports the app (and, through
+ApiConfig.ready, the CLIP weights) once, and forked workers share the
+weights copy-on-write. Each worker warms up before serving requests.
+"""
+
+import os
+
+preload_app = os.environ.get("CLIP_PRELOAD", "False") == "True"
+
+# Allow time for the warm-up forward pass and index load in each worker
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
+
+
+def post_worker_init(worker):
+    # Database connections must not be shared with the master process
+    from django.db import connections
+
+    connections.close_all()
+
+    from api import warmup
+
+    warmup.warm_up()
+
+
+def worker_exit(server, worker):
+    # Write search history still buffered in this worker
+    from api import history
+
+    history.flush()
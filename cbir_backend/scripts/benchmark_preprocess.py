@@ -0,0 +1,112 @@
+"""
+Benchmark CLIP image preprocessing over a mix of image sizes.
+
+Compares the previous path (full-resolution decode, bicubic resize, crop,
+normalize) with ``api.clip_utils.preprocess_images`` (JPEG draft decode,
+reducing resize, EXIF orientation, vectorized normalize) on synthetic
+JPEG and PNG files, and reports images/sec per size plus how far the fast
+tensors drift from the full-resolution reference.
+
+Usage:
+    python scripts/benchmark_preprocess.py [--count 8] [--repeat 3]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import django
+import numpy as np
+from PIL import Image, ImageOps
+
+# Setup Django
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cbir_backend.settings')
+django.setup()
+
+from api.clip_utils import CLIP_INPUT_SIZE, _PIXEL_OFFSET, _PIXEL_SCALE, preprocess_images
+from benchmarks.corpus import synthetic_image
+
+# (label, width, height, format, EXIF orientation)
+CASES = [
+    ("VGA JPEG", 640, 480, "JPEG", 1),
+    ("1080p JPEG", 1920, 1080, "JPEG", 1),
+    ("12MP JPEG (rotated)", 4032, 3024, "JPEG", 6),
+    ("24MP JPEG", 6000, 4000, "JPEG", 1),
+    ("1080p PNG", 1920, 1080, "PNG", 1),
+]
+
+
+def write_case(directory, label, width, height, fmt, orientation, count):
+    paths = []
+    for index in range(count):
+        image = synthetic_image(width, height, seed=index)
+        path = os.path.join(directory, f"{label.split()[0]}_{index}.{fmt.lower()}")
+        if fmt == "JPEG":
+            exif = Image.Exif()
+            exif[0x0112] = orientation
+            image.save(path, "JPEG", quality=90, exif=exif)
+        else:
+            image.save(path, fmt)
+        paths.append(path)
+    return paths
+
+
+def reference_preprocess(paths, size=CLIP_INPUT_SIZE):
+    """The previous behaviour: decode at full resolution, then resize and crop."""
+    arrays = []
+    for path in paths:
+        image = ImageOps.exif_transpose(Image.open(path).convert("RGB"))
+        width, height = image.size
+        scale = size / min(width, height)
+        image = image.resize((max(size, int(width * scale)), max(size, int(height * scale))),
+                             Image.Resampling.BICUBIC)
+        left = int(round((image.width - size) / 2.0))
+        top = int(round((image.height - size) / 2.0))
+        image = image.crop((left, top, left + size, top + size))
+        arrays.append((np.asarray(image, dtype=np.float32) * _PIXEL_SCALE + _PIXEL_OFFSET).transpose(2, 0, 1))
+    return np.stack(arrays)
+
+
+def best_time(func, paths, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(paths)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=8, help="Images per size.")
+    parser.add_argument("--repeat", type=int, default=3, help="Best of N timed passes.")
+    args = parser.parse_args()
+
+    print("🚀 Benchmarking CLIP preprocessing...")
+    print(f"{'case':<22} {'ref img/s':>10} {'fast img/s':>11} {'speedup':>8} {'max |Δ|':>8} {'mean |Δ|':>9}")
+
+    totals = {"reference": 0.0, "fast": 0.0, "images": 0}
+    with tempfile.TemporaryDirectory() as directory:
+        for label, width, height, fmt, orientation in CASES:
+            paths = write_case(directory, label, width, height, fmt, orientation, args.count)
+            ref_seconds, reference = best_time(reference_preprocess, paths, args.repeat)
+            fast_seconds, fast = best_time(preprocess_images, paths, args.repeat)
+            drift = np.abs(reference - fast)
+
+            totals["reference"] += ref_seconds
+            totals["fast"] += fast_seconds
+            totals["images"] += len(paths)
+            print(f"{label:<22} {len(paths) / ref_seconds:>10.1f} {len(paths) / fast_seconds:>11.1f} "
+                  f"{ref_seconds / fast_seconds:>7.1f}x {drift.max():>8.3f} {drift.mean():>9.4f}")
+
+    print(f"\n📊 Mixed workload: {totals['images'] / totals['reference']:.1f} → "
+          f"{totals['images'] / totals['fast']:.1f} images/sec "
+          f"({totals['reference'] / totals['fast']:.1f}x)")
+    print("✅ Done!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Guard against heavy imports at Django startup.
+
+Imports the URL configuration (and with it every view) in a fresh
+interpreter, resolves the auth and image-list endpoints, and fails if
+torch, clip or faiss were loaded or if startup took longer than the
+allowed time.
+
+Usage:
+    python scripts/check_import_time.py [--max-seconds 3.0]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("torch", "torchvision", "clip", "faiss", "onnxruntime")
+
+PROBE = """
+import json, os, sys, time
+sys.path.insert(0, {base_dir!r})
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "cbir_backend.settings")
+started = time.perf_counter()
+import django
+django.setup()
+import cbir_backend.urls
+from django.urls import resolve
+for path in ("/api/auth/login/", "/api/auth/user/", "/api/images/list/", "/api/token/"):
+    resolve(path)
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    "seconds": elapsed,
+    "heavy": [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--max-seconds", type=float, default=3.0)
+    parser.add_argument("--runs", type=int, default=3, help="Best of N fresh interpreters.")
+    args = parser.parse_args()
+
+    code = PROBE.format(base_dir=BASE_DIR, heavy=HEAVY_MODULES)
+    results = []
+    for _ in range(args.runs):
+        output = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=BASE_DIR
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    best = min(result["seconds"] for result in results)
+    heavy = sorted({name for result in results for name in result["heavy"]})
+    print(f"⏱️  Django startup + URL import: {best:.2f}s (best of {args.runs})")
+
+    failed = False
+    if heavy:
+        print(f"❌ Heavy modules imported at startup: {', '.join(heavy)}")
+        failed = True
+    if best > args.max_seconds:
+        print(f"❌ Startup slower than {args.max_seconds:.2f}s")
+        failed = True
+
+    if failed:
+        sys.exit(1)
+    print("✅ No ML stack imported at startup")
+
+
+if __name__ == "__main__":
+    main()
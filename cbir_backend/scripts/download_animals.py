@@ -17,9 +17,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "cbir_backend.settings")
 django.setup()
 
-import torch
-import clip
-import numpy as np
+from django.core.management import call_command
 from PIL import Image as PILImage
 from api.models import DatasetImage
 
@@ -182,54 +180,8 @@ def create_db_records(media_dir):
 
 
 def batch_extract():
-    """Extract CLIP features in batches."""
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    model, preprocess = clip.load("ViT-B/32", device=device)
-    model.eval()
-    
-    unprocessed = list(DatasetImage.objects.filter(feature_vector__isnull=True))
-    total = len(unprocessed)
-    
-    if total == 0:
-        print("  ✅ All images already indexed!")
-        return
-    
-    print(f"  🧠 Processing {total} images in batches of {BATCH_SIZE}...")
-    processed = 0
-    errors = 0
-    
-    for i in range(0, total, BATCH_SIZE):
-        batch = unprocessed[i:i + BATCH_SIZE]
-        tensors = []
-        valid = []
-        
-        for img_obj in batch:
-            try:
-                img = PILImage.open(img_obj.image.path).convert("RGB")
-                tensors.append(preprocess(img).unsqueeze(0))
-                valid.append(img_obj)
-            except Exception:
-                errors += 1
-        
-        if not tensors:
-            continue
-        
-        batch_tensor = torch.cat(tensors, dim=0).to(device)
-        with torch.no_grad():
-            features = model.encode_image(batch_tensor)
-            features /= features.norm(dim=-1, keepdim=True)
-        
-        features_np = features.cpu().numpy().astype(np.float32)
-        for j, img_obj in enumerate(valid):
-            img_obj.feature_vector = features_np[j].tolist()
-        
-        DatasetImage.objects.bulk_update(valid, ["feature_vector"], batch_size=100)
-        processed += len(valid)
-        
-        if processed % (BATCH_SIZE * 3) == 0 or (i + BATCH_SIZE) >= total:
-            print(f"    ✅ {processed}/{total} done")
-    
-    print(f"  🎯 Done! Processed: {processed}, Errors: {errors}")
+    """Extract CLIP features in batches with the shared indexing pipeline."""
+    call_command("index_dataset", batch_size=BATCH_SIZE)
 
 
 def main():
@@ -23,10 +23,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "cbir_backend.settings")
 django.setup()
 
-import torch
-import clip
-import numpy as np
-from PIL import Image as PILImage
+from django.core.management import call_command
 from torchvision.datasets import Flowers102
 from scipy.io import loadmat
 
@@ -186,45 +183,9 @@ def setup_dataset():
     print("🧠 Step 4: Extracting CLIP features...")
     print("=" * 60)
 
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    print(f"⚙️  Using device: {device}")
-
-    model, preprocess = clip.load("ViT-B/32", device=device)
-    model.eval()
-    print("✅ CLIP model loaded!")
-
-    unprocessed = DatasetImage.objects.filter(feature_vector__isnull=True)
-    total = unprocessed.count()
-    print(f"📸 {total} images need feature extraction")
-
-    processed = 0
-    errors = 0
-    for img_obj in unprocessed.iterator():
-        try:
-            img_path = img_obj.image.path
-            image = PILImage.open(img_path).convert("RGB")
-            image_tensor = preprocess(image).unsqueeze(0).to(device)
-
-            with torch.no_grad():
-                features = model.encode_image(image_tensor)
-                features /= features.norm(dim=-1, keepdim=True)
-
-            feature_list = features.cpu().numpy().flatten().tolist()
-            img_obj.feature_vector = feature_list
-            img_obj.save()
-            processed += 1
-
-            if processed % 100 == 0:
-                print(f"  ✅ Processed {processed}/{total} images...")
-
-        except Exception as e:
-            errors += 1
-            if errors <= 5:
-                print(f"  ❌ Error on {img_obj.filename}: {e}")
+    call_command("index_dataset")
 
     print(f"\n🎯 Feature extraction complete!")
-    print(f"   ✅ Processed: {processed}")
-    print(f"   ❌ Errors: {errors}")
     print(f"   📊 Total indexed images: {DatasetImage.objects.exclude(feature_vector__isnull=True).count()}")
     print("\n🚀 Dataset is ready! You can now search for similar images.")
 
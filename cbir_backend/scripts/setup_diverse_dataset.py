@@ -18,10 +18,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "cbir_backend.settings")
 django.setup()
 
-import torch
-import clip
-import numpy as np
-from PIL import Image as PILImage
+from django.core.management import call_command
 from api.models import DatasetImage
 
 BATCH_SIZE = 32  # Process 32 images at once for speed
@@ -128,60 +125,9 @@ def create_db_records(media_dir, base_media_dir):
     return len(new_records)
 
 
-def batch_extract_features(model, preprocess, device):
-    """Extract CLIP features in batches for maximum speed."""
-    unprocessed = list(DatasetImage.objects.filter(feature_vector__isnull=True))
-    total = len(unprocessed)
-    
-    if total == 0:
-        print("  ✅ All images already have features!")
-        return
-    
-    print(f"  🧠 Processing {total} images in batches of {BATCH_SIZE}...")
-    
-    processed = 0
-    errors = 0
-    
-    for batch_start in range(0, total, BATCH_SIZE):
-        batch = unprocessed[batch_start:batch_start + BATCH_SIZE]
-        
-        # Load and preprocess batch
-        tensors = []
-        valid_items = []
-        
-        for img_obj in batch:
-            try:
-                img = PILImage.open(img_obj.image.path).convert("RGB")
-                tensor = preprocess(img).unsqueeze(0)
-                tensors.append(tensor)
-                valid_items.append(img_obj)
-            except Exception:
-                errors += 1
-                continue
-        
-        if not tensors:
-            continue
-        
-        # Batch CLIP inference (FAST!)
-        batch_tensor = torch.cat(tensors, dim=0).to(device)
-        with torch.no_grad():
-            features = model.encode_image(batch_tensor)
-            features /= features.norm(dim=-1, keepdim=True)
-        
-        features_np = features.cpu().numpy().astype(np.float32)
-        
-        # Update DB records
-        for i, img_obj in enumerate(valid_items):
-            img_obj.feature_vector = features_np[i].tolist()
-        
-        # Bulk update
-        DatasetImage.objects.bulk_update(valid_items, ["feature_vector"], batch_size=100)
-        
-        processed += len(valid_items)
-        if processed % (BATCH_SIZE * 5) == 0 or processed == total:
-            print(f"    ✅ {processed}/{total} done ({errors} errors)")
-    
-    print(f"  🎯 Complete! Processed: {processed}, Errors: {errors}")
+def batch_extract_features():
+    """Extract CLIP features in batches with the shared indexing pipeline."""
+    call_command("index_dataset", batch_size=BATCH_SIZE)
 
 
 def main():
@@ -222,14 +168,7 @@ def main():
     print("🧠 Step 5: Extracting CLIP features (BATCH mode)...")
     print("=" * 60)
     
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    print(f"  ⚙️ Device: {device}")
-    
-    model, preprocess = clip.load("ViT-B/32", device=device)
-    model.eval()
-    print("  ✅ CLIP model loaded!")
-    
-    batch_extract_features(model, preprocess, device)
+    batch_extract_features()
 
     # Summary
     total = DatasetImage.objects.count()